@@ -0,0 +1,228 @@
+"""
+Outcome analytics over game logs (see simulate.py --log and replay.py).
+
+Games stream through a generator pipeline, records -> replayed hands ->
+a running OutcomeStats, so memory stays flat however large the log is:
+only one game is ever in memory, and the tallies are keyed by round number
+and hand length, never by game. Summary tables print as text; charts need
+matplotlib, which is imported only when one is asked for.
+
+    python simulate.py --games 10000 --seats 4 --log games.log
+    python analytics.py games.log --workers 8 --chart outcomes.png
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+import replay
+from game_logic import HUMAN, Game
+
+
+def hands(records):
+    """
+    Replays every (seed, seats, log) record and yields one tuple per
+    completed hand: (seats, round, winner, turns, phases, final), where
+    phases are every seat's phase indices after the hand and final is True
+    for the hand that finished the game. A game cut off mid-hand yields the
+    hands it completed.
+    """
+    for seed, seats, log in records:
+        game = Game(seed, seats)
+        round_ = game.round
+        phases = list(game.phases)
+        turn = game.turn
+        turns = 0
+        for game in replay.steps(game, log):
+            if game.round != round_:
+                winner = next(seat for seat in range(seats) if game.phases[seat] != phases[seat])
+                phases = list(game.phases)
+                yield seats, round_, winner, turns + 1, tuple(phases), game.over
+                round_ = game.round
+                turn = game.turn
+                turns = 0
+            elif game.turn != turn:
+                turn = game.turn
+                turns += 1
+
+
+class OutcomeStats:
+    """Running tallies over a stream of hands, mergeable across workers."""
+
+    def __init__(self):
+        self.games = 0
+        self.hands = 0
+        self.turns = 0
+        self.rounds = 0  # summed over finished games
+        self.wins = []  # finished games won, per seat
+        self.hand_wins = []  # hands won, per seat
+        self.turns_per_hand = {}  # hand length in turns -> hands
+        # round number -> [hands, leader's phase sum, mean phase sum] after the hand
+        self.phases_by_round = {}
+
+    def add(self, hand):
+        seats, round_, winner, turns, phases, final = hand
+        while len(self.wins) < seats:
+            self.wins.append(0)
+            self.hand_wins.append(0)
+        self.hands += 1
+        self.turns += turns
+        self.hand_wins[winner] += 1
+        self.turns_per_hand[turns] = self.turns_per_hand.get(turns, 0) + 1
+        totals = self.phases_by_round.setdefault(round_, [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += max(phases)
+        totals[2] += sum(phases) / seats
+        if final:
+            self.games += 1
+            self.rounds += round_
+            self.wins[max(range(seats), key=phases.__getitem__)] += 1
+        return self
+
+    def merge(self, other):
+        self.games += other.games
+        self.hands += other.hands
+        self.turns += other.turns
+        self.rounds += other.rounds
+        for mine, theirs in ((self.wins, other.wins), (self.hand_wins, other.hand_wins)):
+            mine.extend([0] * (len(theirs) - len(mine)))
+            for seat, count in enumerate(theirs):
+                mine[seat] += count
+        for turns, count in other.turns_per_hand.items():
+            self.turns_per_hand[turns] = self.turns_per_hand.get(turns, 0) + count
+        for round_, (count, leader, mean) in other.phases_by_round.items():
+            totals = self.phases_by_round.setdefault(round_, [0, 0, 0.0])
+            totals[0] += count
+            totals[1] += leader
+            totals[2] += mean
+        return self
+
+    def summary(self):
+        bot_wins = sum(wins for seat, wins in enumerate(self.wins) if seat != HUMAN)
+        return {
+            "games": self.games,
+            "hands": self.hands,
+            "avg_rounds_per_game": self.rounds / self.games if self.games else 0.0,
+            "avg_turns_per_hand": self.turns / self.hands if self.hands else 0.0,
+            "bot_win_rate": bot_wins / self.games if self.games else 0.0,
+            "wins": list(self.wins),
+            "hand_wins": list(self.hand_wins),
+            # Phases are 1-based here, as players count them
+            "phases_by_round": [
+                {
+                    "round": round_,
+                    "hands": count,
+                    "leader_phase": leader / count + 1,
+                    "mean_phase": mean / count + 1,
+                }
+                for round_, (count, leader, mean) in sorted(self.phases_by_round.items())
+            ],
+            "turns_per_hand": dict(sorted(self.turns_per_hand.items())),
+        }
+
+
+# ------------------------------
+# Pipeline
+# ------------------------------
+def _batches(records, size):
+    records = iter(records)
+    while batch := list(itertools.islice(records, size)):
+        yield batch
+
+
+def summarize_chunk(records):
+    """Worker entry point: OutcomeStats for a chunk of records."""
+    stats = OutcomeStats()
+    for hand in hands(records):
+        stats.add(hand)
+    return stats
+
+
+def summarize_file(path, workers=1, chunk_size=200):
+    """OutcomeStats over every game in a log file, replayed across `workers` processes."""
+    workers = workers or os.cpu_count() or 1
+    with open(path, "rb") as f:
+        records = replay.read_records(f)
+        if workers == 1:
+            return summarize_chunk(records)
+        total = OutcomeStats()
+        with multiprocessing.Pool(workers) as pool:
+            for partial in pool.imap_unordered(summarize_chunk, _batches(records, chunk_size)):
+                total.merge(partial)
+    return total
+
+
+# ------------------------------
+# Output
+# ------------------------------
+def format_tables(summary):
+    """The summary as plain-text tables."""
+    games = summary["games"]
+    lines = [
+        f"games {games}  hands {summary['hands']}  "
+        f"rounds/game {summary['avg_rounds_per_game']:.1f}  "
+        f"turns/hand {summary['avg_turns_per_hand']:.1f}  "
+        f"bot win rate {summary['bot_win_rate']:.1%}",
+        "",
+        f"{'seat':>4} {'games won':>10} {'win rate':>9} {'hands won':>10}",
+    ]
+    for seat, (wins, hand_wins) in enumerate(zip(summary["wins"], summary["hand_wins"])):
+        rate = wins / games if games else 0.0
+        lines.append(f"{seat:>4} {wins:>10} {rate:>9.1%} {hand_wins:>10}")
+    lines += ["", f"{'round':>5} {'hands':>7} {'leader phase':>13} {'mean phase':>11}"]
+    for row in summary["phases_by_round"]:
+        lines.append(f"{row['round']:>5} {row['hands']:>7} {row['leader_phase']:>13.2f} "
+                     f"{row['mean_phase']:>11.2f}")
+    return "\n".join(lines)
+
+
+def plot(summary, path):
+    """Writes phase progress by round, hand lengths and wins per seat to an image file."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (progress, lengths, wins) = plt.subplots(1, 3, figsize=(15, 4.5))
+    rounds = [row["round"] for row in summary["phases_by_round"]]
+    progress.plot(rounds, [row["leader_phase"] for row in summary["phases_by_round"]], label="leader")
+    progress.plot(rounds, [row["mean_phase"] for row in summary["phases_by_round"]], label="mean")
+    progress.set(title="Phase reached by round", xlabel="round", ylabel="phase")
+    progress.legend()
+
+    turns = summary["turns_per_hand"]
+    lengths.bar(list(turns), list(turns.values()), width=1.0)
+    lengths.set(title="Turns per hand", xlabel="turns", ylabel="hands")
+
+    seats = range(len(summary["wins"]))
+    wins.bar([str(seat) for seat in seats], summary["wins"])
+    wins.set(title=f"Games won (bot win rate {summary['bot_win_rate']:.1%})", xlabel="seat",
+             ylabel="games")
+
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize logged Phase 10 games")
+    parser.add_argument("path", help="log file written by simulate.py --log")
+    parser.add_argument("--workers", type=int, default=1, help="0 for the CPU count")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games per worker task")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON instead")
+    parser.add_argument("--chart", help="also plot the summary to this image file (needs matplotlib)")
+    args = parser.parse_args(argv)
+
+    summary = summarize_file(args.path, args.workers, args.chunk_size).summary()
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_tables(summary))
+    if args.chart:
+        plot(summary, args.chart)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,196 @@
-from flask import Flask, render_template, request, redirect, url_for
-from game_logic import Game
+import functools
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, abort, make_response
+import events
+import metrics
+from bot import DeadlinePolicy, QuickPolicy, default_policy
+from game_logic import HUMAN, Game
+from game_store import GameStore
+from snapshot import SnapshotStore
+from state_api import ACTIONS, apply_action, apply_actions, event_view, game_view, state_since
+
+def load_secret_key(snapshot_path):
+    """
+    The key session cookies are signed with. Every worker has to share it,
+    or a cookie from one is rejected by the next and the visitor silently
+    starts a new game. PHASE10_SECRET_KEY sets it; failing that, workers
+    sharing a snapshot store share a key file created next to it on first
+    start. A server told to run several workers (WEB_CONCURRENCY) with
+    neither refuses to start; a single process makes up its own key.
+    """
+    key = os.environ.get("PHASE10_SECRET_KEY")
+    if key:
+        return key
+    if snapshot_path:
+        path = snapshot_path + ".key"
+        if not os.path.exists(path):
+            # Written aside and linked into place, so a racing worker never reads half a key.
+            scratch = f"{path}.{os.getpid()}"
+            with open(os.open(scratch, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(os.urandom(32).hex().encode())
+            try:
+                os.link(scratch, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(scratch)
+        with open(path, "rb") as f:
+            return f.read().decode()
+    if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+        raise RuntimeError("several workers need a shared PHASE10_SECRET_KEY (or PHASE10_SNAPSHOT_PATH)")
+    return os.urandom(32)
 
 app = Flask(__name__)
-game = Game()
+snapshot_path = os.environ.get("PHASE10_SNAPSHOT_PATH")
+app.secret_key = load_secret_key(snapshot_path)
+games = GameStore(
+    max_games=int(os.environ.get("PHASE10_MAX_GAMES", 10000)),
+    ttl_seconds=int(os.environ.get("PHASE10_GAME_TTL", 3600)),
+    backing=SnapshotStore(snapshot_path) if snapshot_path else None,
+    factory=functools.partial(Game, seats=int(os.environ.get("PHASE10_SEATS", 2))),
+)
+metrics.install_flask(app)
+render_page = metrics.timed("phase10_template_render_seconds", "game.html render latency")(render_template)
+event_hub = events.EventHub()
+# Computer turns run here instead of inside a request: one task per game at a
+# time, at most PHASE10_BOT_QUEUE of them queued or running. Each bot decision
+# runs on think_pool (processes if PHASE10_BOT_PROCESSES is set) and gets
+# PHASE10_BOT_DEADLINE_MS before the quick fallback move is played instead.
+bot_workers = int(os.environ.get("PHASE10_BOT_WORKERS", 4))
+bot_pool = ThreadPoolExecutor(max_workers=bot_workers)
+think_processes = int(os.environ.get("PHASE10_BOT_PROCESSES", 0))
+think_pool = ProcessPoolExecutor(think_processes) if think_processes else ThreadPoolExecutor(bot_workers)
+bot_deadline = float(os.environ.get("PHASE10_BOT_DEADLINE_MS", 250)) / 1000
+bot_slots = threading.BoundedSemaphore(int(os.environ.get("PHASE10_BOT_QUEUE", 256)))
+bot_pending = set()  # game ids with a computer turn task queued or running
+bot_pending_lock = threading.Lock()
+
+def session_game_id():
+    if "game_id" not in session:
+        session["game_id"] = uuid.uuid4().hex
+    return session["game_id"]
+
+def current_game():
+    """Checks out this visitor's game, locked for the rest of the request."""
+    return games.checkout(session_game_id())
+
+def bot_policy():
+    return DeadlinePolicy(default_policy(), think_pool, bot_deadline)
+
+def run_computer_turn(game_id, policy=None):
+    """
+    Plays the computer seats up to the player's turn (with bot_policy()
+    unless given a policy), publishing each step to the game's event channel.
+    """
+    channel = event_hub.channel(game_id)
+    publish = lambda kind, data: channel.publish(kind, event_view(kind, data))
+    try:
+        with games.checkout(game_id) as game:
+            # From here on a turn passing to a computer seat needs a task of its own.
+            with bot_pending_lock:
+                bot_pending.discard(game_id)
+            if game.turn == HUMAN:
+                return
+            while game.turn != HUMAN and not game.over:
+                game.computer_turn(on_event=publish, policy=policy or bot_policy())
+            channel.publish("done", {"version": game.version, "turn": game.turn})
+    except Exception:
+        app.logger.exception("computer turn failed for game %s", game_id)
+        channel.publish("done", {"error": True})
+
+def _queued_computer_turn(game_id):
+    try:
+        run_computer_turn(game_id)
+    finally:
+        with bot_pending_lock:
+            bot_pending.discard(game_id)
+        bot_slots.release()
+
+def start_computer_turn():
+    """
+    Hands the computer seats' turns to bot_pool and returns at once; the page
+    follows them on the event stream. If the queue is full they're played
+    here and now with the quick policy instead of waiting in an unbounded queue.
+    """
+    game_id = session_game_id()
+    with bot_pending_lock:
+        if game_id in bot_pending:
+            return
+        queued = bot_slots.acquire(blocking=False)
+        if queued:
+            bot_pending.add(game_id)
+    if queued:
+        bot_pool.submit(_queued_computer_turn, game_id)
+    else:
+        run_computer_turn(game_id, QuickPolicy())
 
 @app.route("/")
 def home():
-    return render_template("game.html", game=game)
+    event_seq = event_hub.channel(session_game_id()).seq
+    with current_game() as game:
+        # The page depends only on which game this is (a reset deals a new seed),
+        # its state version and the event stream position.
+        etag = f"{game.seed:x}-{game.version}-{event_seq}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(render_page("game.html", game=game, view=game_view(game),
+                                                 event_seq=event_seq))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+@app.route("/events")
+def game_events():
+    channel = event_hub.channel(session_game_id())
+    try:
+        since = int(request.headers.get("Last-Event-ID") or request.args.get("since") or 0)
+    except ValueError:
+        abort(400)
+    response = Response(events.stream(channel, since), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 @app.route("/draw", methods=["POST"])
 def draw_card():
-    if game.current_turn == "player":
-        from_discard = "from_discard" in request.form
-        game.draw_card("player", from_discard=from_discard)
+    with current_game() as game:
+        if game.turn == HUMAN:
+            from_discard = "from_discard" in request.form
+            game.draw_card(HUMAN, from_discard=from_discard)
     return redirect(url_for("home"))
 
 @app.route("/select_card", methods=["POST"])
 def select_card():
     card_index = int(request.form["card_index"])
-    game.select_card(card_index)
+    with current_game() as game:
+        game.select_card(card_index)
     return redirect(url_for("home"))
 
 @app.route("/discard", methods=["POST"])
 def discard_card():
-    if game.current_turn == "player":
-        success = game.discard_selected_card()
-        if success and not game.skip_turn:
-            return redirect(url_for("computer_turn"))
+    with current_game() as game:
+        if game.turn == HUMAN:
+            success = game.discard_selected_card(request.form.get("target", type=int))
+            if success and game.turn != HUMAN:
+                start_computer_turn()
     return redirect(url_for("home"))
 
 @app.route("/computer_turn")
 def computer_turn():
-    if game.current_turn == "computer":
-        game.computer_turn()
+    with current_game() as game:
+        if game.turn != HUMAN and not game.over:
+            start_computer_turn()
     return redirect(url_for("home"))
 
 @app.route("/submit_phase", methods=["POST"])
 def submit_phase():
-    game.submit_phase()
+    with current_game() as game:
+        game.submit_phase()
     return redirect(url_for("home"))
 
 @app.route("/add_to_phase", methods=["GET", "POST"])
@@ -46,7 +199,8 @@ def add_to_phase():
         card_index = int(request.args.get("card_index"))
     else:
         card_index = int(request.form["card_index"])
-    game.add_to_phase_attempt(card_index)
+    with current_game() as game:
+        game.add_to_phase_attempt(card_index)
     return redirect(url_for("home"))
 
 @app.route("/remove_from_phase", methods=["GET", "POST"])
@@ -55,20 +209,60 @@ def remove_from_phase():
         card_index = int(request.args.get("card_index"))
     else:
         card_index = int(request.form["card_index"])
-    game.remove_from_phase_attempt(card_index)
+    with current_game() as game:
+        game.remove_from_phase_attempt(card_index)
     return redirect(url_for("home"))
 
 @app.route("/hit_phase", methods=["POST"])
 def hit_phase():
     card_index = int(request.form["card_index"])
-    game.hit_existing_phase(card_index)
+    with current_game() as game:
+        game.hit_existing_phase(card_index)
     return redirect(url_for("home"))
 
+@app.route("/api/state")
+def api_state():
+    since = request.args.get("since", type=int)
+    with current_game() as game:
+        return jsonify(state_since(game, since))
+
+@app.route("/api/action/<name>", methods=["POST"])
+def api_action(name):
+    if name not in ACTIONS:
+        abort(404)
+    args = request.get_json(silent=True)
+    if args is None:
+        args = {}
+    elif not isinstance(args, dict):
+        abort(400)
+    with current_game() as game:
+        try:
+            body = apply_action(game, name, args, args.get("since"))
+        except (KeyError, ValueError, TypeError):
+            abort(400)
+        if game.turn != HUMAN and not game.over:
+            start_computer_turn()
+    return jsonify(body)
+
+@app.route("/api/actions", methods=["POST"])
+def api_actions():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400)
+    with current_game() as game:
+        try:
+            response = apply_actions(game, body.get("actions"), body.get("since"))
+        except (KeyError, ValueError, TypeError):
+            abort(400)
+        if game.turn != HUMAN and not game.over:
+            start_computer_turn()
+    return jsonify(response)
+
 @app.route("/reset_game", methods=["POST"])
 def reset_game():
-    game.reset_game()
+    games.discard(session_game_id())
+    event_hub.discard(session_game_id())
     return redirect(url_for("home"))
 
 if __name__ == "__main__":
     app.run(debug=True)
-
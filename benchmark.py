@@ -0,0 +1,272 @@
+"""
+Seeded micro-benchmarks for the game engine and the web hot paths.
+
+Every benchmark draws its inputs from a fixed seed, clears the solver caches
+before each repeat and times only the call under test, so two runs of the
+same tree measure the same work. Results are printed as JSON; pass a
+previous run's file as --baseline to fail (exit 1) on any benchmark that got
+slower than --tolerance times its baseline median.
+
+    python benchmark.py --out bench.json
+    python benchmark.py --baseline bench.json --only can_form_run
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from game_logic import (
+    DECK_SIZE, HUMAN, PHASES, CardList, Deck, Game, Hand, card_code, card_from_code, solve_groups,
+    WILD_BASE, WILD_COUNT,
+)
+
+SEED = 2024
+POOL_SIZE = 256  # distinct inputs each benchmark cycles through
+
+
+def _clear_caches():
+    solve_groups.cache_clear()
+
+
+def _game(seed):
+    return Game(seed=seed)
+
+
+def _shuffled(rng, size=DECK_SIZE):
+    """The first `size` cards off a freshly shuffled deck, dealt the way the game deals them."""
+    deck = Deck(rng)
+    return [deck.pop() for _ in range(size)]
+
+
+def _hands(rng, size, count=POOL_SIZE):
+    return [CardList(_shuffled(rng, size)) for _ in range(count)]
+
+
+# ------------------------------
+# Benchmarks
+# ------------------------------
+# Each one takes a seeded random.Random and returns (setup, run): setup(i)
+# prepares the i-th call's arguments outside the timer, run(*args) is timed.
+
+def bench_deal(rng):
+    # A new hand's dealing: restock the pile, then the discard and two 10-card hands.
+    deck = Deck(rng)
+
+    def run():
+        deck.reset()
+        for _ in range(21):
+            deck.pop()
+
+    return (lambda i: ()), run
+
+
+def bench_start_new_hand(rng):
+    game = _game(SEED)
+    return (lambda i: ()), game.start_new_hand
+
+
+def bench_can_form_set(rng):
+    game = _game(SEED)
+    hands = _hands(rng, 11)
+    return (lambda i: (hands[i % len(hands)], 3 + i % 3)), game._can_form_set
+
+
+def bench_can_form_run(rng):
+    # Worst case for the old exhaustive search: long lists, many wilds,
+    # lots of duplicate numbers and the longest runs.
+    game = _game(SEED)
+    wilds = [card_from_code(WILD_BASE + w) for w in range(WILD_COUNT)]
+    lists = []
+    for _ in range(POOL_SIZE):
+        deck = [card for card in _shuffled(rng) if not card.is_wild()]
+        lists.append(CardList(deck[:24] + wilds[:rng.randint(4, WILD_COUNT)]))
+    return (lambda i: (lists[i % len(lists)], 9 + i % 4)), game._can_form_run
+
+
+def bench_parse_phase_combination(rng):
+    # Every phase in turn, on random 11-card hands (most can't lay it, which
+    # is the common case for a check on every page render).
+    game = _game(SEED)
+    cases = []
+    for i in range(POOL_SIZE):
+        phase_goal = PHASES[i % len(PHASES)]
+        hand = CardList(_shuffled(rng, 11))
+        cases.append((hand, phase_goal))
+    return (lambda i: cases[i % len(cases)]), game.parse_phase_combination
+
+
+def bench_computer_turn(rng):
+    games = [_game(seed) for seed in range(SEED, SEED + 16)]
+
+    def setup(i):
+        game = games[i % len(games)]
+        if game.over or not game.deck:
+            game = games[i % len(games)] = _game(SEED + i)
+        game.turn = 1
+        return (game,)
+
+    return setup, lambda game: game.computer_turn()
+
+
+def bench_hit_existing_phase(rng):
+    # A laid set of 7s and a run of 3..6, hit alternately with a 7 (lands on
+    # the set) and a 2 (walks past the set onto the run's low end).
+    def setup(i):
+        game = _game(SEED)
+        game.lay_combos(HUMAN, [
+            {"type": "set", "cards": [card_from_code(card_code("Red", 7, c % 2)) for c in range(3)]},
+            {"type": "run", "cards": [card_from_code(card_code("Blue", n)) for n in range(3, 7)]},
+        ])
+        game.hands[HUMAN] = Hand([card_from_code(card_code("Green", 2 if i % 2 else 7)),
+                                 card_from_code(card_code("Yellow", 12))])
+        return (game,)
+
+    return setup, lambda game: game.hit_existing_phase(0)
+
+
+def bench_make_unmake(rng):
+    # One lookahead ply and back: draw (deck or discard pile), discard, undo both.
+    games = [_game(seed) for seed in range(SEED, SEED + 16)]
+
+    def setup(i):
+        game = games[i % len(games)]
+        return game, game.turn, bool(i % 2), rng.randrange(11)
+
+    def run(game, seat, from_discard, card_index):
+        drew = game.make(("draw", seat, from_discard))
+        discarded = game.make(("discard", seat, card_index, None))
+        game.unmake(discarded)
+        game.unmake(drew)
+
+    return setup, run
+
+
+def bench_flask_round_trip(rng):
+    import app as web
+    from bot import default_policy
+
+    # Play the computer's turn inside the request that hands it over, as
+    # /computer_turn used to, so each iteration is a whole round and the
+    # timings stay comparable with runs from before the bot pool.
+    web.start_computer_turn = lambda: web.run_computer_turn(web.session_game_id(), default_policy())
+    web.games.factory = lambda: Game(seed=SEED)
+    web.app.config["TESTING"] = True
+    client = web.app.test_client()
+
+    def setup(i):
+        if i % 50 == 0:
+            client.post("/reset_game")
+        return ()
+
+    def run():
+        client.post("/draw")
+        client.post("/select_card", data={"card_index": "0"})
+        client.post("/discard")
+        client.get("/computer_turn")
+        client.get("/")
+
+    return setup, run
+
+
+BENCHMARKS = {
+    "deal": (bench_deal, 2000),
+    "start_new_hand": (bench_start_new_hand, 2000),
+    "can_form_set": (bench_can_form_set, 2000),
+    "can_form_run": (bench_can_form_run, 2000),
+    "parse_phase_combination": (bench_parse_phase_combination, 2000),
+    "computer_turn": (bench_computer_turn, 2000),
+    "hit_existing_phase": (bench_hit_existing_phase, 2000),
+    "make_unmake": (bench_make_unmake, 2000),
+    "flask_round_trip": (bench_flask_round_trip, 200),
+}
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+def measure(factory, iterations, repeats):
+    """Median/mean/min/max microseconds per call over `repeats` fresh repeats."""
+    samples = []
+    for _ in range(repeats):
+        setup, run = factory(random.Random(SEED))
+        _clear_caches()
+        elapsed = 0
+        for i in range(iterations):
+            args = setup(i)
+            start = time.perf_counter_ns()
+            run(*args)
+            elapsed += time.perf_counter_ns() - start
+        samples.append(elapsed / iterations / 1000)
+    return {
+        "iterations": iterations,
+        "repeats": repeats,
+        "median_us": statistics.median(samples),
+        "mean_us": statistics.fmean(samples),
+        "min_us": min(samples),
+        "max_us": max(samples),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results, baseline, tolerance):
+    """Names of benchmarks whose median grew past tolerance x the baseline's."""
+    slower = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and result["median_us"] > before["median_us"] * tolerance:
+            slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Phase 10 engine and web routes")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier on iteration counts")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        factory, iterations = BENCHMARKS[name]
+        results[name] = measure(factory, max(1, int(iterations * args.scale)), args.repeats)
+        print(f"{name}: {results[name]['median_us']:.1f} us", file=sys.stderr)
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "seed": SEED,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        slower = regressions(results, baseline, args.tolerance)
+        for name in slower:
+            print(f"REGRESSION {name}: {baseline[name]['median_us']:.1f} -> "
+                  f"{results[name]['median_us']:.1f} us", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
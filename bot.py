@@ -0,0 +1,398 @@
+"""
+Monte Carlo draw/discard policy for the computer seats.
+
+MonteCarloPolicy plays out sampled futures from the cards the seat to play has
+not seen (the deck plus the other seats' hands) and keeps the draw source and
+discard whose futures lay the phase soonest. The search is anytime: it plays
+rounds of rollouts for every candidate move and returns the best move found
+so far once its time or rollout budget runs out.
+
+Rollouts never touch Game objects. A hand is a row of slot counts (numbers
+1..12, wild, skip; or the four colors, wild, skip for color phases) and the
+unseen cards are an array of codes. Every candidate's rollouts are played
+together as one NumPy matrix, a row per rollout, so a simulated turn is a
+handful of array operations for the whole batch, with positions scored from
+the compiled phase's table (phase_batch.table_missing).
+
+    game.computer_turn(policy=MonteCarloPolicy(time_budget=0.005))
+
+DeadlinePolicy runs any policy's decisions on an executor with a hard
+deadline, falling back to QuickPolicy's one-lookup discard when a decision
+is late, so the caller's wait per move is bounded however slow the search.
+"""
+import functools
+import os
+import random
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from game_logic import (
+    COLORS, CARDS, WILD_COUNT, WILD_SLOT, solve_groups,
+)
+from phase_batch import table_missing
+
+SKIP_SLOT = 13
+# Slot of every card code: in number space (0..11, wild, skip) and in color space
+# (0..3, wild, skip), so drawing or discarding a card is one list increment.
+NUMBER_SLOTS = tuple(
+    card.number - 1 if card.color_index is not None else (SKIP_SLOT if card.is_skip() else WILD_SLOT)
+    for card in CARDS
+)
+COLOR_WILD = len(COLORS)
+COLOR_SKIP = COLOR_WILD + 1
+COLOR_SLOTS = tuple(
+    card.color_index if card.color_index is not None else (COLOR_SKIP if card.is_skip() else COLOR_WILD)
+    for card in CARDS
+)
+_NUMBER_SLOTS = np.array(NUMBER_SLOTS, dtype=np.intp)
+_COLOR_SLOTS = np.array(COLOR_SLOTS, dtype=np.intp)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _plan_demand(set_sizes, run_length, hist):
+    """
+    Cards of each number the solver's plan for hist would use. Cached on its
+    own and solved past solve_groups' cache, so rollouts don't evict the
+    entries the game itself relies on.
+    """
+    numbers, start = solve_groups.__wrapped__(set_sizes, run_length, hist)[2]
+    demand = [0] * 12
+    for size, number in zip(set_sizes, numbers):
+        demand[number - 1] += size
+    if run_length:
+        for number in range(start, start + run_length):
+            demand[number - 1] += 1
+    return tuple(demand)
+
+
+class _GroupPhase:
+    """Rollout scoring for set/run phases, in number-slot space."""
+    slots = NUMBER_SLOTS
+    slot_array = _NUMBER_SLOTS
+    width = 14
+
+    def __init__(self, phase_goal):
+        self.goal = phase_goal
+        self.set_sizes, self.run_length = phase_goal.set_sizes, phase_goal.run_length
+        # Copies past these counts can't change the plan (the tables clamp the same way),
+        # so clamped histograms share plan cache entries.
+        number_cap = min(sum(self.set_sizes) + (1 if self.run_length else 0), WILD_COUNT)
+        self.caps = (number_cap,) * 12 + (min(phase_goal.size, WILD_COUNT),)
+
+    def missing_rows(self, counts):
+        """Cards still missing for every row of a rollout count matrix."""
+        return table_missing(self.goal, counts[:, :13])
+
+    def plan(self, counts):
+        """Cards of each number the solver's plan for counts would use."""
+        return _plan_demand(self.set_sizes, self.run_length, tuple(map(min, counts, self.caps)))
+
+    def throwaway(self, counts, rng, demand=None):
+        """
+        Slot the rollout's own quick policy discards: a skip, else a card the
+        plan (demand, or the plan for counts) can't use.
+        """
+        if counts[SKIP_SLOT]:
+            return SKIP_SLOT
+        if demand is None:
+            demand = self.plan(counts)
+        spare = [n for n in range(12) if counts[n] > demand[n]]
+        if spare:
+            return spare[rng.randrange(len(spare))]
+        held = [n for n in range(12) if counts[n]]
+        return held[rng.randrange(len(held))] if held else WILD_SLOT
+
+    def throwaway_rows(self, counts, demand, rng):
+        """throwaway for every row of a count matrix, against one plan per row."""
+        numbers = counts[:, :12]
+        # Spare cards outrank held ones and a random key below 1 breaks ties, so the
+        # highest score is a uniform pick among the best kind a row has.
+        score = rng.random(numbers.shape, dtype=np.float32)
+        score += numbers > 0
+        score += numbers > demand
+        slot = score.argmax(axis=1)
+        slot[score[np.arange(len(slot)), slot] < 1] = WILD_SLOT
+        slot[counts[:, SKIP_SLOT] > 0] = SKIP_SLOT
+        return slot
+
+
+class _ColorPhase:
+    """Rollout scoring for "N cards of one color" phases, in color-slot space."""
+    slots = COLOR_SLOTS
+    slot_array = _COLOR_SLOTS
+    width = len(COLORS) + 2
+
+    def __init__(self, phase_goal):
+        self.size = phase_goal["color"]
+
+    def missing_rows(self, counts):
+        best = counts[:, :COLOR_WILD].max(axis=1)
+        unfilled = self.size - np.minimum(best, self.size)
+        return np.maximum(np.maximum(unfilled - counts[:, COLOR_WILD], best == 0), 0)
+
+    def plan(self, counts):
+        return ()
+
+    def throwaway(self, counts, rng, demand=None):
+        if counts[COLOR_SKIP]:
+            return COLOR_SKIP
+        best = max(range(COLOR_WILD), key=counts.__getitem__)
+        others = [c for c in range(COLOR_WILD) if c != best and counts[c]]
+        if others:
+            return min(others, key=counts.__getitem__)
+        return best if counts[best] else COLOR_WILD
+
+    def throwaway_rows(self, counts, demand, rng):
+        colors = counts[:, :COLOR_WILD]
+        rows = np.arange(len(counts))
+        best = colors.argmax(axis=1)
+        # The scarcest other color held, else the best one, else a wild
+        none = np.iinfo(colors.dtype).max
+        others = np.where(colors > 0, colors, none)
+        others[rows, best] = none
+        slot = np.where(others.min(axis=1) < none, others.argmin(axis=1),
+                        np.where(colors[rows, best] > 0, best, COLOR_WILD))
+        return np.where(counts[:, COLOR_SKIP] > 0, COLOR_SKIP, slot)
+
+
+def _hand_counts(game):
+    """(phase scorer, slot counts) for the hand of the seat to play."""
+    phase_goal = game.PHASES[game.phases[game.turn]]
+    phase = _ColorPhase(phase_goal) if phase_goal.get("color") else _GroupPhase(phase_goal)
+    counts = [0] * phase.width
+    for card in game.hands[game.turn]:
+        counts[phase.slots[card.code]] += 1
+    return phase, counts
+
+
+def _sample_draws(rng, rows, size, depth):
+    """
+    A rows x depth matrix of indices into a pool of size cards: each row the
+    first depth cards of an independent shuffle. Rows are drawn with
+    replacement and redrawn until they have no repeats, which is exact and,
+    with a pool several times deeper than a row, far cheaper than shuffling;
+    near the end of the deck every row is shuffled instead.
+    """
+    if size < 8 * depth:
+        return rng.random((rows, size), dtype=np.float32).argsort(axis=1)[:, :depth]
+    draws = rng.integers(0, size, (rows, depth))
+    redo = np.arange(rows)
+    while len(redo):
+        ordered = np.sort(draws[redo], axis=1)
+        redo = redo[(ordered[:, 1:] == ordered[:, :-1]).any(axis=1)]
+        draws[redo] = rng.integers(0, size, (len(redo), depth))
+    return draws
+
+
+class MonteCarloPolicy:
+    def __init__(self, time_budget=0.005, max_rollouts=20000, horizon=8, batch=512, max_round=8192,
+                 seed=None):
+        self.time_budget = time_budget
+        self.max_rollouts = max_rollouts
+        self.horizon = horizon
+        # Rollouts in the first round and the most in any round, shared by the candidates
+        self.batch = batch
+        self.max_round = max_round
+        self.rng = np.random.default_rng(seed)
+
+    # ------------------------------
+    # Policy interface used by Game.computer_turn
+    # ------------------------------
+    def choose_draw(self, game):
+        """True to take the top of the discard pile, False to draw from the deck."""
+        top = game.discard_pile[-1] if game.discard_pile else None
+        if game.submitted[game.turn] or top is None or top.is_skip():
+            return False
+        phase, counts, pool = self._position(game)
+        taken = counts.copy()
+        taken[phase.slots[top.code]] += 1
+        demand = np.asarray(phase.plan(taken.tolist()), dtype=np.int8)
+        taken[phase.throwaway_rows(taken[None], demand, self.rng)[0]] -= 1
+
+        # Candidate 0: take the known top card. Candidate 1: draw blind.
+        totals, runs = self._search(phase, [taken, counts], [False, True], pool)
+        return totals[0] * runs[1] <= totals[1] * runs[0]
+
+    def choose_discard(self, game):
+        """Index into the hand of the seat to play of the card to throw away."""
+        hand = game.hands[game.turn]
+        if game.submitted[game.turn]:
+            return 0
+        phase, counts, pool = self._position(game)
+        # One candidate per distinct slot; which physical copy goes doesn't matter.
+        first_index = {}
+        for i, card in enumerate(hand):
+            first_index.setdefault(phase.slots[card.code], i)
+        slots = list(first_index)
+        if len(slots) == 1:
+            return first_index[slots[0]]
+
+        starts = []
+        for slot in slots:
+            after = counts.copy()
+            after[slot] -= 1
+            starts.append(after)
+        totals, runs = self._search(phase, starts, [False] * len(slots), pool)
+        best = min(range(len(slots)), key=lambda i: totals[i] / runs[i] if runs[i] else float("inf"))
+        return first_index[slots[best]]
+
+    # ------------------------------
+    # Search internals
+    # ------------------------------
+    def _position(self, game):
+        """Rollout view of the seat to play's position: (phase scorer, slot counts, unseen codes)."""
+        phase, counts = _hand_counts(game)
+        return (phase, np.array(counts, dtype=np.int8),
+                np.array(game.unseen.unseen_codes(game.turn), dtype=np.intp))
+
+    def _search(self, phase, starts, blind, pool):
+        """
+        Plays rounds of rollouts from every candidate's starting counts (a
+        blind candidate draws once more first) until the time or rollout
+        budget is spent, always at least one round. The first round is
+        `batch` rollouts; later ones are sized to fill the time left, up to
+        max_round, from how long the rounds so far took. Returns the
+        per-candidate score totals and rollout counts.
+        """
+        candidates = len(starts)
+        totals = np.zeros(candidates)
+        runs = np.zeros(candidates, dtype=np.intp)
+        deadline = time.perf_counter() + self.time_budget
+        demand = np.stack([np.asarray(phase.plan(start.tolist()), dtype=np.int8) for start in starts])
+        starts = np.stack(starts)
+        blind = np.asarray(blind)
+        per_round = max(1, self.batch // candidates)
+        last = None  # (rollouts, seconds) of the previous round
+        while runs.sum() < self.max_rollouts:
+            per_round = min(per_round, -(-(self.max_rollouts - runs.sum()) // candidates))
+            began = time.perf_counter()
+            costs = self._rollouts(phase, np.repeat(starts, per_round, axis=0),
+                                   np.repeat(demand, per_round, axis=0),
+                                   np.repeat(blind, per_round), pool)
+            totals += costs.reshape(candidates, per_round).sum(axis=1)
+            runs += per_round
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            # Round time as a fixed cost plus a cost per rollout, fitted to the last
+            # two rounds; after the first, all of it counts as per rollout.
+            size, took = costs.size, now - began
+            fixed, each = 0.0, took / size
+            if last is not None and last[0] != size and (took - last[1]) / (size - last[0]) > 0:
+                each = (took - last[1]) / (size - last[0])
+                fixed = max(0.0, took - each * size)
+            last = size, took
+            per_round = min(int((deadline - now - fixed) / each), self.max_round) // candidates
+            if per_round < 1:
+                break
+        return totals.tolist(), runs.tolist()
+
+    def _rollouts(self, phase, counts, demand, blind, pool):
+        """
+        Plays one sampled future per row of counts and returns their costs:
+        the number of turns until the phase can be laid, or horizon + cards
+        still missing. Rows flagged in blind first draw and discard once
+        more, from the hand before drawing. Each row's simulated seat sticks
+        to the plan in its demand row: re-solving every sampled hand would
+        cost more than the rest of the rollout put together.
+        """
+        rng = self.rng
+        rows = np.arange(len(counts))
+        counts = counts.copy()
+        # Every row's draws, in order, as slots; a blind row makes its first one up front.
+        depth = min(len(pool), self.horizon + 1)
+        draws = phase.slot_array[pool].take(_sample_draws(rng, len(counts), len(pool), depth))
+        if depth and blind.any():
+            counts[rows, draws[:, 0]] += blind
+            counts[rows, phase.throwaway_rows(counts, demand, rng)] -= blind
+            draws[blind] = np.roll(draws[blind], -1, axis=1)
+        left = depth - blind  # draws each row has before the unseen cards run out
+        short = left.min()
+
+        cost = np.full(len(counts), -1)
+        # A turn brings a hand at most one card closer, so a row scored as m cards
+        # short can't be ready before m turns later and isn't scored again till then.
+        due = np.zeros(len(counts), dtype=np.intp)
+        for turn in range(self.horizon):
+            playing = cost < 0
+            ended = turn >= left if turn >= short else None
+            scored = np.flatnonzero(playing & (due <= turn) if ended is None
+                                    else playing & ((due <= turn) | ended))
+            if len(scored):
+                missing = phase.missing_rows(counts[scored])
+                cost[scored[missing == 0]] = turn
+                if ended is not None:
+                    stuck = ended[scored] & (missing > 0)
+                    cost[scored[stuck]] = self.horizon + missing[stuck]
+                due[scored] = turn + missing
+                playing = cost < 0
+                if not playing.any():
+                    return cost
+            counts[rows, draws[:, turn]] += playing
+            counts[rows, phase.throwaway_rows(counts, demand, rng)] -= playing
+        playing = np.flatnonzero(cost < 0)
+        cost[playing] = self.horizon + phase.missing_rows(counts[playing])
+        return cost
+
+
+class QuickPolicy:
+    """
+    The rollouts' own one-step play as a policy: always draws blind and
+    throws away a skip, else a card the solver's plan for the hand can't use.
+    A decision is a cached solver lookup or two, with no search.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose_draw(self, game):
+        return False
+
+    def choose_discard(self, game):
+        if game.submitted[game.turn]:
+            return 0
+        phase, counts = _hand_counts(game)
+        slot = phase.throwaway(counts, self.rng)
+        hand = game.hands[game.turn]
+        return next((i for i, card in enumerate(hand) if phase.slots[card.code] == slot), 0)
+
+
+class DeadlinePolicy:
+    """
+    Bounds another policy's thinking time. Each decision runs on `executor`
+    against a clone of the game, so the wrapped policy never shares state
+    with the live one; if it isn't back within `deadline` seconds,
+    `fallback` decides instead and the late answer is dropped. With a
+    process pool the policy and the clone are pickled for every decision.
+    misses counts the decisions that fell back.
+    """
+
+    def __init__(self, policy, executor, deadline, fallback=None):
+        self.policy = policy
+        self.executor = executor
+        self.deadline = deadline
+        self.fallback = fallback or QuickPolicy()
+        self.misses = 0
+
+    def choose_draw(self, game):
+        return self._decide(self.policy.choose_draw, self.fallback.choose_draw, game)
+
+    def choose_discard(self, game):
+        return self._decide(self.policy.choose_discard, self.fallback.choose_discard, game)
+
+    def _decide(self, choose, fallback, game):
+        future = self.executor.submit(choose, game.clone())
+        try:
+            return future.result(timeout=self.deadline)
+        except FutureTimeout:
+            # Still queued: never start it. Already running: it finishes on its clone, unread.
+            future.cancel()
+            self.misses += 1
+            return fallback(game)
+
+
+def default_policy():
+    """The policy the web game uses; PHASE10_BOT_BUDGET_MS sets its time per decision."""
+    return MonteCarloPolicy(time_budget=float(os.environ.get("PHASE10_BOT_BUDGET_MS", 5)) / 1000)
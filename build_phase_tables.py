@@ -0,0 +1,104 @@
+"""
+Builds the phase lookup tables that game_logic memory-maps at import.
+
+For each non-color PHASES entry (house rules included, if PHASE10_PHASES
+names a phase list), every histogram of at most --max-cards cards
+is enumerated in lexicographic order and scored with the vectorized solver
+(phase_batch.batch_missing). Counts are clamped first: a number held more
+often than the phase could ever use it, or more wilds than the phase has
+slots, changes nothing, so each table stays a few MB.
+
+    python build_phase_tables.py            # writes phase_tables.bin
+"""
+import argparse
+import json
+
+import numpy as np
+
+from game_logic import PHASES, TABLES_MAGIC, TABLES_PATH, WILD_COUNT, GroupPhase, PhaseTable
+from phase_batch import batch_missing
+
+CHUNK_ROWS = 1 << 18
+
+
+def table_caps(set_sizes, run_length):
+    """Largest count per slot (numbers 1..12, then wilds) that can still matter."""
+    number_cap = min(sum(set_sizes) + (1 if run_length else 0), WILD_COUNT)
+    wild_cap = min(sum(set_sizes) + run_length, WILD_COUNT)
+    return (number_cap,) * 12 + (wild_cap,)
+
+
+def enumerate_histograms(caps, max_cards):
+    """All histograms within caps with total <= max_cards, in lexicographic order."""
+    rows = np.zeros((1, 0), dtype=np.int8)
+    totals = np.zeros(1, dtype=np.int16)
+    for cap in caps:
+        values = np.arange(cap + 1, dtype=np.int16)
+        new_totals = totals[:, None] + values[None, :]
+        row_index, value_index = np.nonzero(new_totals <= max_cards)  # row-major = lexicographic
+        rows = np.hstack([rows[row_index], values[value_index, None].astype(np.int8)])
+        totals = new_totals[row_index, value_index]
+    return rows
+
+
+def build_table(phase_goal, max_cards):
+    set_sizes, run_length = phase_goal.set_sizes, phase_goal.run_length
+    caps = table_caps(set_sizes, run_length)
+    hists = enumerate_histograms(caps, max_cards)
+    data = np.empty(len(hists), dtype=np.uint8)
+    for start in range(0, len(hists), CHUNK_ROWS):
+        chunk = hists[start:start + CHUNK_ROWS].astype(np.int16)
+        data[start:start + CHUNK_ROWS] = batch_missing(phase_goal, chunk)
+    # The loader ranks histograms independently; check both agree on the layout.
+    table = PhaseTable(data, caps, max_cards)
+    for row in np.random.default_rng(0).integers(len(hists), size=1000):
+        assert table.missing(tuple(hists[row])) == data[row]
+    return set_sizes, run_length, caps, data
+
+
+def write_tables(path, max_cards):
+    entries = []
+    blobs = []
+    seen = set()
+    for phase_goal in PHASES:
+        if not isinstance(phase_goal, GroupPhase):
+            continue
+        key = (phase_goal.set_sizes, phase_goal.run_length)
+        if key in seen:
+            continue
+        seen.add(key)
+        set_sizes, run_length, caps, data = build_table(phase_goal, max_cards)
+        entries.append({"set_sizes": list(set_sizes), "run_length": run_length,
+                        "caps": list(caps), "max_cards": max_cards, "length": len(data)})
+        blobs.append(data.tobytes())
+        print(f"phase {set_sizes} run {run_length}: {len(data):,} histograms")
+
+    # Offsets depend on the header's own length, so size it with placeholders first.
+    for entry in entries:
+        entry["offset"] = 0
+    header_length = len(json.dumps(entries)) + 20 * len(entries)
+    offset = 8 + header_length
+    for entry, blob in zip(entries, blobs):
+        entry["offset"] = offset
+        offset += len(blob)
+    header = json.dumps(entries).encode().ljust(header_length)
+
+    with open(path, "wb") as f:
+        f.write(TABLES_MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Phase 10 phase lookup tables")
+    parser.add_argument("--out", default=TABLES_PATH)
+    parser.add_argument("--max-cards", type=int, default=11,
+                        help="largest hand the tables cover (10 dealt + 1 drawn)")
+    args = parser.parse_args(argv)
+    write_tables(args.out, args.max_cards)
+
+
+if __name__ == "__main__":
+    main()
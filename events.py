@@ -0,0 +1,84 @@
+"""
+Per-game event channels for Server-Sent Events.
+
+The computer's turn runs off the request thread and publishes each step
+(draw, phase, discard, done) to its game's EventChannel. /events streams the
+channel to the browser. Every event has a sequence number, and a channel
+keeps its recent history, so a client that connects (or reconnects with
+Last-Event-ID) after an event was published still receives it.
+
+Channels live in the worker process that plays the turn. Under several
+workers an /events stream may reach one whose channel stays silent, so the
+page also polls /api/state while it waits and reloads once the turn is back.
+"""
+import collections
+import json
+import threading
+
+
+class EventChannel:
+    def __init__(self, history=64):
+        self._events = collections.deque(maxlen=history)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        """Sequence number of the latest event (0 before the first one)."""
+        return self._seq
+
+    def publish(self, kind, data):
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, kind, data))
+            self._cond.notify_all()
+
+    def wait(self, since, timeout=None):
+        """
+        Returns the events newer than `since`, blocking up to `timeout`
+        seconds for one to arrive. An empty list means the wait timed out.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > since, timeout)
+            return [event for event in self._events if event[0] > since]
+
+
+class EventHub:
+    """Channels by game id, keeping at most max_channels (least recently used go first)."""
+
+    def __init__(self, max_channels=10000):
+        self.max_channels = max_channels
+        self._channels = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def channel(self, game_id):
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                channel = self._channels[game_id] = EventChannel()
+                while len(self._channels) > self.max_channels:
+                    self._channels.popitem(last=False)
+            else:
+                self._channels.move_to_end(game_id)
+            return channel
+
+    def discard(self, game_id):
+        with self._lock:
+            self._channels.pop(game_id, None)
+
+
+def format_sse(seq, kind, data):
+    return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(channel, since, keepalive=15):
+    """Generator of SSE text for a channel, starting after event `since`."""
+    yield "retry: 2000\n\n"
+    while True:
+        events = channel.wait(since, timeout=keepalive)
+        if not events:
+            yield ": keepalive\n\n"
+            continue
+        for seq, kind, data in events:
+            yield format_sse(seq, kind, data)
+            since = seq
@@ -1,12 +1,22 @@
 import random
 import collections
+import functools
+import itertools
+import json
+import mmap
+import os
+from array import array
+
+import metrics
 
 COLORS = ["Red", "Blue", "Green", "Yellow"]
 NUMBERS = list(range(1, 13))
 WILD_COUNT = 8
 SKIP_COUNT = 4
 
-PHASES = [
+# The standard phases, in play order, as specs (see compile_phase). The PHASES
+# games play are compiled from these, or from PHASE10_PHASES's file if set.
+STANDARD_PHASES = [
     {"sets": 2, "set_size": 3}, # Phase 1: Two sets of three
     {"sets": 1, "set_size": 3, "run": 4}, # Phase 2: One set of 3 and one run of 4
     {"sets": 1, "set_size": 4, "run": 4}, # Phase 3: One set of 4 and one run of 4
@@ -19,420 +29,1368 @@ PHASES = [
     {"sets": 1, "set_size": 5, "set_2": 3}, # Phase 10: One set of 5 and one set of 3
 ]
 
+# ------------------------------
+# Cards
+# ------------------------------
+# Every physical card has a small-int code 0..107:
+#   0..95    colored numbers: color_index * 24 + (number - 1) * 2 + copy
+#   96..103  wilds
+#   104..107 skips
+# There is exactly one Card object per code (see CARDS), so decks, piles and
+# hands only ever store codes or references to the shared, immutable cards.
+WILD_BASE = len(COLORS) * len(NUMBERS) * 2
+SKIP_BASE = WILD_BASE + WILD_COUNT
+DECK_SIZE = SKIP_BASE + SKIP_COUNT
+
+
 class Card:
-    def __init__(self, color, number):
-        self.color = color  # e.g. "Red", "Blue", or None for Wild/Skip
-        self.number = number  # e.g. 1..12, "Wild", or "Skip"
+    __slots__ = ("code", "color", "number", "color_index", "css_color")
+
+    def __init__(self, code):
+        if code < WILD_BASE:
+            color_index = code // 24
+            color, number = COLORS[color_index], code % 24 // 2 + 1
+        elif code < SKIP_BASE:
+            color_index, color, number = None, None, "Wild"
+        else:
+            color_index, color, number = None, None, "Skip"
+        set_attr = object.__setattr__
+        set_attr(self, "code", code)
+        set_attr(self, "color", color)  # e.g. "Red", "Blue", or None for Wild/Skip
+        set_attr(self, "number", number)  # e.g. 1..12, "Wild", or "Skip"
+        set_attr(self, "color_index", color_index)
+        set_attr(self, "css_color", color.lower() if color else "gray")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable")
+
+    def __reduce__(self):
+        return (card_from_code, (self.code,))
 
     def is_wild(self):
-        return self.number == "Wild"
+        return WILD_BASE <= self.code < SKIP_BASE
 
     def is_skip(self):
-        return self.number == "Skip"
+        return self.code >= SKIP_BASE
 
     def __repr__(self):
         return f"Card({self.color}, {self.number})"
 
-def create_deck():
-    deck = [Card(color, num) for color in COLORS for num in NUMBERS for _ in range(2)]
-    deck += [Card(None, "Wild")] * WILD_COUNT
-    deck += [Card(None, "Skip")] * SKIP_COUNT
-    random.shuffle(deck)
-    return deck
+
+CARDS = tuple(Card(code) for code in range(DECK_SIZE))
+FULL_DECK = array("B", range(DECK_SIZE))
+
+
+def card_from_code(code):
+    return CARDS[code]
+
+
+def card_code(color, number, copy=0):
+    """Code of a card by face value, e.g. card_code("Red", 5) or card_code(None, "Wild")."""
+    if number == "Wild":
+        return WILD_BASE + copy
+    if number == "Skip":
+        return SKIP_BASE + copy
+    return COLORS.index(color) * 24 + (number - 1) * 2 + copy
+
+
+class CardList:
+    """
+    A sequence of cards stored as a byte array of card codes.
+    Indexing and iteration hand back the interned Card objects.
+    """
+    __slots__ = ("codes",)
+
+    def __init__(self, cards=()):
+        self.codes = array("B", [card.code for card in cards])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __bool__(self):
+        return bool(self.codes)
+
+    def __iter__(self):
+        return map(CARDS.__getitem__, self.codes)
+
+    @classmethod
+    def from_codes(cls, codes):
+        return cls(CARDS[code] for code in codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CARDS[code] for code in self.codes[index]]
+        return CARDS[self.codes[index]]
+
+    def append(self, card):
+        self.codes.append(card.code)
+
+    def pop(self, index=-1):
+        return CARDS[self.codes.pop(index)]
+
+    def clear(self):
+        del self.codes[:]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class Hand(CardList):
+    """
+    A CardList that also keeps the solver's count vectors up to date:
+    'counts' is the 13-slot histogram (numbers 1..12, then wilds) and
+    'colors' the per-color count of non-wild cards.
+
+    A hand can carry a phase 'goal'; its 'distance' is then the number of
+    cards it is still missing for that goal. Moving a card only marks the
+    distance stale (O(1)); reading it costs one memoized solver lookup, and
+    nothing at all if the hand hasn't changed since the last read.
+
+    'version' goes up on every change to the hand's contents, so anything
+    derived from them can be cached against it.
+    """
+    __slots__ = ("counts", "colors", "version", "_goal", "_distance")
+
+    def __init__(self, cards=(), goal=None):
+        super().__init__(cards)
+        self.counts = [0] * 13
+        self.colors = [0] * len(COLORS)
+        self._goal = goal
+        self._distance = None
+        self.version = 0
+        for code in self.codes:
+            self._count(CARDS[code], 1)
+
+    @property
+    def goal(self):
+        return self._goal
+
+    @goal.setter
+    def goal(self, phase_goal):
+        self._goal = phase_goal
+        self._distance = None
+
+    @property
+    def distance(self):
+        """Cards still missing for the hand's goal (0 = can lay it), None without a goal."""
+        if self._distance is None and self._goal is not None:
+            self._distance = self._goal.deficit(self)
+        return self._distance
+
+    def _count(self, card, delta):
+        if card.color_index is not None:
+            self.counts[card.number - 1] += delta
+            self.colors[card.color_index] += delta
+            self._distance = None
+        elif card.code < SKIP_BASE:
+            self.counts[WILD_SLOT] += delta
+            self._distance = None
+
+    def append(self, card):
+        self.codes.append(card.code)
+        self._count(card, 1)
+        self.version += 1
+
+    def pop(self, index=-1):
+        card = CARDS[self.codes.pop(index)]
+        self._count(card, -1)
+        self.version += 1
+        return card
+
+    def insert(self, index, card):
+        self.codes.insert(index, card.code)
+        self._count(card, 1)
+        self.version += 1
+
+    def clear(self):
+        del self.codes[:]
+        self.counts = [0] * 13
+        self.colors = [0] * len(COLORS)
+        self._distance = None
+        self.version += 1
+
+    def remove_indices(self, indices):
+        """Removes the cards at the given positions in a single O(n) pass."""
+        drop = set(indices)
+        kept = array("B")
+        for i, code in enumerate(self.codes):
+            if i in drop:
+                self._count(CARDS[code], -1)
+            else:
+                kept.append(code)
+        self.codes = kept
+        self.version += 1
+
+
+class Deck:
+    """
+    The draw pile, shuffled lazily. The undrawn cards are pool[:size] in no
+    particular order; pop() picks one of them at random and swaps it past
+    the end, one step of Fisher-Yates, so dealing costs only the cards dealt
+    instead of a full 108-card shuffle. The pool is allocated once per game:
+    reset() restocks it for the next hand and refill() loads recycled
+    discards into it.
+    """
+    __slots__ = ("rng", "pool", "size")
+
+    def __init__(self, rng=random, codes=None):
+        self.rng = rng
+        self.pool = array("B", FULL_DECK)
+        self.size = DECK_SIZE
+        if codes is not None:
+            self.refill(codes)
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __iter__(self):
+        return map(CARDS.__getitem__, self.codes)
+
+    @property
+    def codes(self):
+        """The undrawn card codes in pool order, which with the RNG state fixes the draw order."""
+        return self.pool[:self.size]
+
+    def pop(self):
+        size = self.size - 1
+        if size < 0:
+            raise IndexError("pop from empty deck")
+        pool = self.pool
+        pick = self.rng.randrange(size + 1)
+        pool[pick], pool[size] = pool[size], pool[pick]
+        self.size = size
+        return CARDS[pool[size]]
+
+    def reset(self):
+        """Restocks all 108 cards."""
+        self.pool[:] = FULL_DECK
+        self.size = DECK_SIZE
+
+    def refill(self, codes):
+        """Makes codes the undrawn cards."""
+        size = len(codes)
+        self.pool[:size] = array("B", codes)
+        self.size = size
+
+    def __repr__(self):
+        return f"Deck({self.size} cards)"
+
+
+# ------------------------------
+# Phase Solver
+# ------------------------------
+# A hand is reduced to a 13-slot histogram: counts of numbers 1..12 followed
+# by the wild count (skips never help a phase). Every set/run phase can be
+# decided from that histogram alone, so results are memoized on it.
+WILD_SLOT = 12
+
+
+def hand_histogram(cards):
+    """Returns the canonical 13-slot count vector for a list of cards."""
+    if isinstance(cards, Hand):
+        return tuple(cards.counts)
+    counts = [0] * 13
+    for card in cards:
+        if card.is_wild():
+            counts[WILD_SLOT] += 1
+        elif not card.is_skip():
+            counts[card.number - 1] += 1
+    return tuple(counts)
+
+
+def color_counts(cards):
+    """Returns the number of non-wild cards of each color, in COLORS order."""
+    if isinstance(cards, Hand):
+        return tuple(cards.colors)
+    counts = [0] * len(COLORS)
+    for card in cards:
+        if card.color_index is not None:
+            counts[card.color_index] += 1
+    return tuple(counts)
+
+
+def phase_requirements(phase_goal):
+    """
+    Flattens a phase spec into (set_sizes, run_length), in spec order.
+    e.g. {"sets": 1, "set_size": 5, "set_2": 2} => ((5, 2), 0)
+    """
+    set_sizes = [phase_goal.get("set_size", 0)] * phase_goal.get("sets", 0)
+    if phase_goal.get("set_2"):
+        set_sizes.append(phase_goal["set_2"])
+    return tuple(set_sizes), phase_goal.get("run", 0)
+
+
+@functools.lru_cache(maxsize=None)
+def _set_slot_choices(set_sizes, width):
+    """
+    Every assignment of one of `width` candidate numbers to each set. Sets of
+    equal size are interchangeable, so their choices are kept non-decreasing.
+    """
+    choices = []
+    for slots in itertools.product(range(width), repeat=len(set_sizes)):
+        if all(slots[i] <= slots[i + 1]
+               for i in range(len(slots) - 1)
+               if set_sizes[i] == set_sizes[i + 1]):
+            choices.append(slots)
+    return tuple(choices)
+
+
+# Plans scored, per thread; the instrumented GroupPhase methods report how many each call took.
+SCORED_PLANS = metrics.Tally()
+
+
+@metrics.tallied(SCORED_PLANS)
+def _score_plan(set_sizes, numbers, run_length, start, hist, window_naturals):
+    """
+    Scores one assignment of set numbers and run start against a histogram.
+    Returns (missing, unfilled): the fewest cards that must be added before
+    the assignment can be laid, and how many slots naturals cannot fill.
+
+    Naturals go to each set first (one apiece, so every set has a natural),
+    then to the run, then fill out the sets. Wilds cover whatever is left.
+    window_naturals is the number of distinct numbers held inside the run
+    window, so only the set numbers need individual attention: O(len(sets)).
+    """
+    taken = {}
+    for size, number in zip(set_sizes, numbers):
+        demand, firsts = taken.get(number, (0, 0))
+        taken[number] = (demand + size, firsts + 1)
+
+    used = window_naturals
+    run_naturals = window_naturals
+    bare = 0  # combos left without a single natural card
+    for number, (demand, firsts) in taken.items():
+        have = hist[number - 1]
+        if firsts > have:
+            bare += firsts - have
+        if run_length and start <= number < start + run_length:
+            if have:
+                # The window count already gave this number to the run.
+                used -= 1
+                if have <= firsts:
+                    run_naturals -= 1
+            demand += 1
+        used += have if have < demand else demand
+    if run_length and not run_naturals:
+        bare += 1
+
+    unfilled = sum(set_sizes) + run_length - used
+    return max(bare, unfilled - hist[WILD_SLOT], 0), unfilled
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def solve_groups(set_sizes, run_length, hist):
+    """
+    Exact solver for phases made of sets and at most one run.
+    Returns (missing, unfilled, plan) for the best assignment, where
+    plan = (set_numbers, run_start). missing == 0 means the hand can lay
+    the phase; ties prefer the plan that spends the fewest wilds.
+
+    Only a few numbers are worth assigning to a set: swapping a set's number
+    for an unused one held at least as often never hurts, so outside the
+    run window only the len(set_sizes) most-held numbers are candidates.
+    Inside the window every held number is, since it competes with the run.
+    """
+    k = len(set_sizes)
+    ranked = sorted(NUMBERS, key=lambda n: -hist[n - 1])
+    if run_length:
+        present = [0]
+        for count in hist[:12]:
+            present.append(present[-1] + (count > 0))
+        windows = []
+        for start in range(1, 14 - run_length):
+            end = start + run_length
+            candidates = [n for n in range(start, end) if hist[n - 1]]
+            candidates += [n for n in ranked if not start <= n < end][:k]
+            windows.append((start, present[end - 1] - present[start - 1], candidates))
+    else:
+        windows = [(None, 0, ranked[:k])]
+
+    best = None
+    for start, window_naturals, candidates in windows:
+        for slots in _set_slot_choices(set_sizes, len(candidates)):
+            numbers = tuple(candidates[slot] for slot in slots)
+            missing, unfilled = _score_plan(set_sizes, numbers, run_length, start, hist,
+                                            window_naturals)
+            if best is None or (missing, unfilled) < best[:2]:
+                best = (missing, unfilled, (numbers, start))
+                if missing == 0 and unfilled == 0:
+                    return best
+    return best
+
+
+metrics.cache_collector("phase10_solver_cache_total", "solve_groups cache lookups", solve_groups)
+
+
+def solve_color(size, hist, colors):
+    """
+    Solver for "N cards of one color" phases.
+    Returns (missing, unfilled, color_index) for the strongest color.
+    """
+    color_index = max(range(len(colors)), key=colors.__getitem__)
+    naturals = min(colors[color_index], size)
+    unfilled = size - naturals
+    bare = 0 if naturals else 1
+    return max(bare, unfilled - hist[WILD_SLOT], 0), unfilled, color_index
+
+
+def assign_group_indices(cards, set_sizes, run_length, plan):
+    """
+    Turns a solver plan into concrete card indices, following the same
+    allocation order as _score_plan. Returns one index list per set, then
+    one for the run (in run order, wilds sitting in the gaps) if there is one.
+    """
+    numbers, start = plan
+    naturals = [[] for _ in range(12)]
+    wilds = []
+    for i, card in enumerate(cards):
+        if card.is_wild():
+            wilds.append(i)
+        elif not card.is_skip():
+            naturals[card.number - 1].append(i)
+
+    groups = [[] for _ in set_sizes]
+    for group, number in zip(groups, numbers):
+        if naturals[number - 1]:
+            group.append(naturals[number - 1].pop())
+    if run_length:
+        run = []
+        for number in range(start, start + run_length):
+            pool = naturals[number - 1]
+            run.append(pool.pop() if pool else wilds.pop())
+    for group, size, number in zip(groups, set_sizes, numbers):
+        pool = naturals[number - 1]
+        while len(group) < size:
+            group.append(pool.pop() if pool else wilds.pop())
+    if run_length:
+        groups.append(run)
+    return groups
+
+
+# ------------------------------
+# Precomputed phase tables
+# ------------------------------
+# build_phase_tables.py enumerates every (clamped) histogram of up to
+# max_cards cards and stores the missing-card count for each non-color phase
+# in one file. It is memory-mapped read-only at import, so every worker
+# process shares the same pages. Without the file the solver answers alone.
+TABLES_PATH = os.environ.get(
+    "PHASE10_TABLES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "phase_tables.bin"))
+TABLES_MAGIC = b"P10T"
+
+
+class PhaseTable:
+    """
+    Missing-card counts for one (set_sizes, run_length) spec, indexed by the
+    lexicographic rank of a clamped histogram among all histograms whose
+    clamped total is at most max_cards.
+    """
+    __slots__ = ("data", "caps", "max_cards", "_offsets")
+
+    def __init__(self, data, caps, max_cards):
+        self.data = data
+        self.caps = caps
+        self.max_cards = max_cards
+        # ways[i][t]: histograms over slots i.. with total <= t
+        ways = [[1] * (max_cards + 1)]
+        for cap in reversed(caps):
+            below = ways[0]
+            ways.insert(0, [sum(below[t - x] for x in range(min(cap, t) + 1))
+                            for t in range(max_cards + 1)])
+        # _offsets[i][t][v]: how many histograms rank before value v in slot i
+        # when t cards of budget remain.
+        self._offsets = []
+        for i, cap in enumerate(caps):
+            per_budget = []
+            for t in range(max_cards + 1):
+                offsets = [0]
+                for x in range(min(cap, t)):
+                    offsets.append(offsets[-1] + ways[i + 1][t - x])
+                per_budget.append(offsets)
+            self._offsets.append(per_budget)
+
+    def __len__(self):
+        return len(self.data)
+
+    @metrics.counted("phase10_phase_lookups_total", "Compiled-phase scores by what answered them",
+                     "source", lambda missing: "table" if missing is not None else "too_big")
+    def missing(self, hist):
+        """Missing-card count for a 13-slot histogram, or None if it is too big for the table."""
+        budget = self.max_cards
+        rank = 0
+        for count, cap, offsets in zip(hist, self.caps, self._offsets):
+            if count > cap:
+                count = cap
+            if count > budget:
+                return None
+            rank += offsets[budget][count]
+            budget -= count
+        return self.data[rank]
+
+
+def load_phase_tables(path=TABLES_PATH):
+    """Maps the table file and returns {(set_sizes, run_length): PhaseTable}; {} if absent."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return {}
+    if buffer[:4] != TABLES_MAGIC:
+        return {}
+    header_length = int.from_bytes(buffer[4:8], "little")
+    header = json.loads(buffer[8:8 + header_length])
+    view = memoryview(buffer)
+    tables = {}
+    for entry in header:
+        data = view[entry["offset"]:entry["offset"] + entry["length"]]
+        key = (tuple(entry["set_sizes"]), entry["run_length"])
+        tables[key] = PhaseTable(data, tuple(entry["caps"]), entry["max_cards"])
+    return tables
+
+
+PHASE_TABLES = load_phase_tables()
+
+
+# ------------------------------
+# Compiled phases
+# ------------------------------
+# A phase spec is a dict in the STANDARD_PHASES format: "sets" sets of
+# "set_size" cards plus an optional set of "set_2", and/or a run of "run"
+# cards; or "color": N cards of one color. compile_phase() checks a spec once
+# and returns its matcher: still that dict (so it displays and serializes as
+# before) but with its requirements, solver and table resolved up front, so
+# deficit() and solve() go straight to the work and a new variant costs
+# nothing per call. Treat matchers as read-only.
+PHASE_KEYS = frozenset(("sets", "set_size", "set_2", "run", "color"))
+# A hand holds at most 11 cards (just after drawing), so no phase can need more
+MAX_PHASE_CARDS = 11
+
+
+class _CompiledPhase(dict):
+    __slots__ = ()
+
+    def __reduce__(self):
+        # Recompile when unpickled: the table is a view of this process's memory map.
+        return compile_phase, (dict(self),)
+
+
+@metrics.counted("phase10_phase_lookups_total", "Compiled-phase scores by what answered them",
+                 "source", "solver")
+def _solver_missing(set_sizes, run_length, hist):
+    return solve_groups(set_sizes, run_length, hist)[0]
+
+
+class GroupPhase(_CompiledPhase):
+    """Sets and/or a run, scored on the hand's number histogram."""
+    __slots__ = ("set_sizes", "run_length", "size", "table")
+
+    def __init__(self, spec, set_sizes, run_length):
+        super().__init__(spec)
+        self.set_sizes = set_sizes
+        self.run_length = run_length
+        self.size = sum(set_sizes) + run_length
+        self.table = PHASE_TABLES.get((set_sizes, run_length))
+
+    @metrics.timed("phase10_phase_deficit_seconds", "GroupPhase.deficit latency", SCORED_PLANS,
+                   "phase10_phase_deficit_plans", "Plans scored per GroupPhase.deficit call")
+    def deficit(self, cards):
+        """How many more cards 'cards' needs before it can lay the phase (0 = ready)."""
+        return self.missing(hand_histogram(cards))
+
+    def missing(self, hist, colors=None):
+        """deficit() for a 13-slot histogram (see hand_histogram); colors aren't needed."""
+        if self.table is not None:
+            missing = self.table.missing(hist)
+            if missing is not None:
+                return missing
+        return _solver_missing(self.set_sizes, self.run_length, hist)
+
+    @metrics.timed("phase10_phase_solve_seconds", "GroupPhase.solve latency", SCORED_PLANS,
+                   "phase10_phase_solve_plans", "Plans scored per GroupPhase.solve call")
+    def solve(self, cards):
+        """See solve_phase."""
+        if len(cards) < self.size:
+            return None
+        hist = hand_histogram(cards)
+        if self.table is not None and self.table.missing(hist):
+            # The table only answers "how many missing"; a hand that can't lay
+            # the phase never needs the solver at all.
+            return None
+        missing, _, plan = solve_groups(self.set_sizes, self.run_length, hist)
+        if missing:
+            return None
+        groups = assign_group_indices(cards, self.set_sizes, self.run_length, plan)
+        solved = [({"type": "set", "number": number}, group)
+                  for group, number in zip(groups, plan[0])]
+        if self.run_length:
+            start = plan[1]
+            solved.append(({"type": "run", "low": start, "high": start + self.run_length - 1},
+                           groups[-1]))
+        return solved
+
+
+class ColorPhase(_CompiledPhase):
+    """N cards of one color, scored on the hand's color counts."""
+    __slots__ = ("size",)
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.size = spec["color"]
+
+    def deficit(self, cards):
+        """How many more cards 'cards' needs before it can lay the phase (0 = ready)."""
+        return self.missing(hand_histogram(cards), color_counts(cards))
+
+    def missing(self, hist, colors):
+        """deficit() for a 13-slot histogram and per-color counts (see color_counts)."""
+        return solve_color(self.size, hist, colors)[0]
+
+    def solve(self, cards):
+        """See solve_phase."""
+        size = self.size
+        missing, _, color_index = solve_color(size, hand_histogram(cards), color_counts(cards))
+        if missing:
+            return None
+        chosen = [i for i, card in enumerate(cards) if card.color_index == color_index][:size]
+        chosen += [i for i, card in enumerate(cards) if card.is_wild()][:size - len(chosen)]
+        return [({"type": "color", "color": COLORS[color_index]}, chosen)]
+
+
+def compile_phase(spec):
+    """
+    The matcher for one phase spec. Raises ValueError for anything that
+    isn't a layable phase: unknown keys, sizes that aren't non-negative
+    ints, a color phase that also asks for sets or a run, or more cards
+    than a hand can hold.
+    """
+    if isinstance(spec, _CompiledPhase):
+        return spec
+    if not isinstance(spec, dict):
+        raise ValueError(f"a phase is a dict of requirements, not {spec!r}")
+    unknown = set(spec) - PHASE_KEYS
+    if unknown:
+        raise ValueError(f"unknown phase keys {sorted(unknown)}")
+    for key, value in spec.items():
+        if type(value) is not int or value < 0:
+            raise ValueError(f"{key} must be a non-negative integer, not {value!r}")
+    if spec.get("color"):
+        if any(value for key, value in spec.items() if key != "color"):
+            raise ValueError("a color phase can't also need sets or a run")
+        if spec["color"] > MAX_PHASE_CARDS:
+            raise ValueError(f"needs {spec['color']} cards; a hand holds at most {MAX_PHASE_CARDS}")
+        return ColorPhase(spec)
+    set_sizes, run_length = phase_requirements(spec)
+    if 0 in set_sizes:
+        raise ValueError("sets need a set_size")
+    if run_length > len(NUMBERS):
+        raise ValueError(f"a run can't be longer than {len(NUMBERS)}")
+    size = sum(set_sizes) + run_length
+    if not 0 < size <= MAX_PHASE_CARDS:
+        raise ValueError(f"needs {size} cards; a phase needs 1 to {MAX_PHASE_CARDS}")
+    # Largest first, so equal sets sit together (see _set_slot_choices) and
+    # every spelling of the same phase shares one solver cache and table.
+    return GroupPhase(spec, tuple(sorted(set_sizes, reverse=True)), run_length)
+
+
+def compile_phases(specs):
+    """Matchers for a list of phase specs, in play order. Raises ValueError naming the bad phase."""
+    phases = []
+    for number, spec in enumerate(specs, 1):
+        try:
+            phases.append(compile_phase(spec))
+        except ValueError as e:
+            raise ValueError(f"phase {number}: {e}") from None
+    return phases
+
+
+def load_phases(path):
+    """
+    Compiles a house-rule phase list from a JSON file holding a list of
+    specs in the STANDARD_PHASES format, in play order, e.g.
+
+        [{"sets": 3, "set_size": 3}, {"run": 5, "sets": 1, "set_size": 3}, {"color": 8}]
+
+    Every process that plays, replays or restores a game must load the same
+    list: logs and snapshots record phase numbers, not the phases.
+    """
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list) or not specs:
+        raise ValueError(f"{path}: expected a non-empty list of phases")
+    return compile_phases(specs)
+
+
+def phase_deficit(cards, phase_goal):
+    """How many more cards 'cards' needs before it can lay phase_goal (0 = ready)."""
+    return phase_goal.deficit(cards)
+
+
+def solve_phase(cards, phase_goal):
+    """
+    Solves a compiled phase against an indexable sequence of cards.
+    Returns None if the phase can't be laid, otherwise a list of
+    (combo, indices) pairs: the combo dict (without its "cards") and the
+    positions in 'cards' that fill it.
+    """
+    return phase_goal.solve(cards)
+
+
+PHASES_PATH = os.environ.get("PHASE10_PHASES")
+PHASES = load_phases(PHASES_PATH) if PHASES_PATH else compile_phases(STANDARD_PHASES)
+
+
+# ------------------------------
+# Laid combos and the hit index
+# ------------------------------
+# A laid combo is a dict with "type" and "cards" plus a summary kept up to
+# date as it is hit: sets carry "number", colors "color", and runs "low" and
+# "high" (the numbers they span, wilds included; run cards stay in run order).
+# Hit slots: numbers 1..12 at 0..11, then one per color, then wilds.
+COLOR_HIT_SLOT = 12
+WILD_HIT_SLOT = COLOR_HIT_SLOT + len(COLORS)
+
+
+def summarize_combo(combo):
+    """Fills in a combo's summary keys if it doesn't have them yet. Returns the combo."""
+    cards = combo["cards"]
+    if combo["type"] == "set" and "number" not in combo:
+        combo["number"] = next((card.number for card in cards if not card.is_wild()), 1)
+    elif combo["type"] == "run" and "low" not in combo:
+        low = 1
+        for position, card in enumerate(cards):
+            if not card.is_wild():
+                low = card.number - position
+                break
+        low = min(max(low, 1), 13 - len(cards))
+        combo["low"] = low
+        combo["high"] = low + len(cards) - 1
+    return combo
+
+
+def hit_slots(combo):
+    """The hit slots of every card that could extend combo."""
+    if combo["type"] == "set":
+        return (combo["number"] - 1, WILD_HIT_SLOT)
+    if combo["type"] == "color":
+        return (COLOR_HIT_SLOT + COLORS.index(combo["color"]), WILD_HIT_SLOT)
+    slots = []
+    if combo["low"] > 1:
+        slots.append(combo["low"] - 2)
+    if combo["high"] < 12:
+        slots.append(combo["high"])
+    if slots:
+        slots.append(WILD_HIT_SLOT)
+    return tuple(slots)
+
+
+def card_hit_slots(card):
+    if card.is_wild():
+        return (WILD_HIT_SLOT,)
+    if card.is_skip():
+        return ()
+    return (card.number - 1, COLOR_HIT_SLOT + card.color_index)
+
+
+def extend_combo(combo, card):
+    """Adds a card that hit_slots says fits, keeping the summary current."""
+    if combo["type"] != "run":
+        combo["cards"].append(card)
+        return
+    # A wild extends the high end unless the run already reaches 12.
+    if (card.is_wild() and combo["high"] < 12) or card.number == combo["high"] + 1:
+        combo["cards"].append(card)
+        combo["high"] += 1
+    else:
+        combo["cards"].insert(0, card)
+        combo["low"] -= 1
+
+
+class HitIndex:
+    """
+    For each hit slot, the laid combos a card in that slot would extend, per
+    seat. Finding where a card can go is a few dict lookups however many
+    combos are down; a combo's entries are refreshed whenever it changes.
+    """
+
+    def __init__(self, played_phases):
+        self._slots = [[{} for _ in range(WILD_HIT_SLOT + 1)] for _ in played_phases]
+        self._keys = {}
+        for seat, combos in enumerate(played_phases):
+            for position, combo in enumerate(combos):
+                self.update(seat, position, summarize_combo(combo))
+
+    def update(self, seat, position, combo):
+        """(Re)indexes the combo at played_phases[seat][position]."""
+        self.remove(seat, position)
+        slots = self._slots[seat]
+        keys = hit_slots(combo)
+        self._keys[(seat, position)] = keys
+        for slot in keys:
+            slots[slot][position] = None
+
+    def remove(self, seat, position):
+        """Drops the combo at played_phases[seat][position] from the index."""
+        slots = self._slots[seat]
+        for slot in self._keys.pop((seat, position), ()):
+            del slots[slot][position]
+
+    def find(self, card, seats):
+        """(seat, position) of the first combo card can extend, trying seats in order; else None."""
+        card_slots = card_hit_slots(card)
+        for seat in seats:
+            slots = self._slots[seat]
+            positions = [position for slot in card_slots for position in slots[slot]]
+            if positions:
+                return seat, min(positions)
+        return None
+
+
+# ------------------------------
+# Unseen cards
+# ------------------------------
+# Count slots: numbers 1..12 at 0..11, then one per color, then wild and skip.
+UNSEEN_COLOR_SLOT = 12
+UNSEEN_WILD_SLOT = UNSEEN_COLOR_SLOT + len(COLORS)
+UNSEEN_SKIP_SLOT = UNSEEN_WILD_SLOT + 1
+UNSEEN_SLOTS = UNSEEN_SKIP_SLOT + 1
+
+
+def _unseen_slots(card):
+    if card.is_wild():
+        return (UNSEEN_WILD_SLOT,)
+    if card.is_skip():
+        return (UNSEEN_SKIP_SLOT,)
+    return (card.number - 1, UNSEEN_COLOR_SLOT + card.color_index)
+
+
+UNSEEN_CARD_SLOTS = tuple(_unseen_slots(card) for card in CARDS)
+FULL_UNSEEN = tuple(sum(slot in slots for slots in UNSEEN_CARD_SLOTS) for slot in range(UNSEEN_SLOTS))
+
+
+class UnseenCards:
+    """
+    For every seat, how many cards of each kind it can't see: the deck plus
+    whatever other seats hold that it hasn't watched go by. 'seen_by' holds
+    each card's bit mask of the seats that know where it is, and moving a
+    card adjusts the counts of only the seats whose bit flips, so every
+    update and every query is O(1).
+    """
+    __slots__ = ("counts", "totals", "seen_by", "everyone")
+
+    def __init__(self, seats, seen_by=None):
+        self.counts = [list(FULL_UNSEEN) for _ in range(seats)]
+        self.totals = [DECK_SIZE] * seats
+        self.seen_by = bytearray(DECK_SIZE)
+        self.everyone = (1 << seats) - 1
+        if seen_by is not None:
+            for code, mask in enumerate(seen_by):
+                self.set(code, mask)
+
+    def set(self, code, mask):
+        """Makes exactly the seats in bit mask `mask` know where card `code` is."""
+        old = self.seen_by[code]
+        if old == mask:
+            return
+        self.seen_by[code] = mask
+        slots = UNSEEN_CARD_SLOTS[code]
+        changed = old ^ mask
+        seat = 0
+        while changed:
+            if changed & 1:
+                delta = -1 if mask >> seat & 1 else 1
+                counts = self.counts[seat]
+                for slot in slots:
+                    counts[slot] += delta
+                self.totals[seat] += delta
+            changed >>= 1
+            seat += 1
+
+    def copy(self):
+        other = UnseenCards.__new__(UnseenCards)
+        other.counts = [list(counts) for counts in self.counts]
+        other.totals = list(self.totals)
+        other.seen_by = bytearray(self.seen_by)
+        other.everyone = self.everyone
+        return other
+
+    def see(self, seat, code):
+        """seat picks the card up (or otherwise learns where it is)."""
+        self.set(code, self.seen_by[code] | 1 << seat)
+
+    def reveal(self, code):
+        """The card is face up for everyone: discarded, laid or hit."""
+        self.set(code, self.everyone)
+
+    def hide(self, code):
+        """The card went back into the deck, so nobody knows where it is."""
+        self.set(code, 0)
+
+    def remaining(self, seat, slot=None):
+        """Cards seat hasn't seen: all of them, or those in one count slot."""
+        return self.totals[seat] if slot is None else self.counts[seat][slot]
+
+    def number(self, seat, number):
+        return self.counts[seat][number - 1]
+
+    def color(self, seat, color):
+        return self.counts[seat][UNSEEN_COLOR_SLOT + COLORS.index(color)]
+
+    def wilds(self, seat):
+        return self.counts[seat][UNSEEN_WILD_SLOT]
+
+    def skips(self, seat):
+        return self.counts[seat][UNSEEN_SKIP_SLOT]
+
+    def share(self, seat, slot):
+        """Fraction of seat's unseen cards that are in slot: its odds of a blind draw hitting one."""
+        total = self.totals[seat]
+        return self.counts[seat][slot] / total if total else 0.0
+
+    def unseen_codes(self, seat):
+        """Codes of the cards seat hasn't seen."""
+        bit = 1 << seat
+        return [code for code, mask in enumerate(self.seen_by) if not mask & bit]
+
+
+# ------------------------------
+# Action log
+# ------------------------------
+# Every Game records the actions played on it as (op, arg) byte pairs. Given
+# the seed, they are all replay.py needs to rebuild the game exactly: the
+# only randomness is the game's own RNG, and the computer's policy decisions
+# are logged as part of its turn. Code outside the Game must therefore never
+# draw from game.rng.
+#
+# The op byte is the action's code; actions any seat can take also carry the
+# seat in its high bits (code | seat << SEAT_SHIFT).
+OP_DRAW = 0               # seat; arg: from_discard
+OP_SELECT = 1             # arg: card index
+OP_DISCARD_SELECTED = 2   # arg: skip target
+OP_DISCARD = 3            # seat; arg: skip target << INDEX_BITS | card index
+OP_ADD_TO_PHASE = 4       # arg: card index
+OP_REMOVE_FROM_PHASE = 5  # arg: card index
+OP_SUBMIT_PHASE = 6
+OP_HIT = 7                # arg: card index
+OP_DUMP_HITS = 8          # seat
+OP_ATTEMPT_PHASE = 9      # seat
+OP_COMPUTER_TURN = 10     # seat; arg: from_discard << INDEX_BITS | discard index, or TURN_UNSCRIPTED
+OP_CODE_MASK = 0x0F
+SEAT_SHIFT = 4
+INDEX_BITS = 5
+NO_CARD = (1 << INDEX_BITS) - 1  # hand index that can't be valid (hands never reach 31 cards)
+NO_TARGET = 0x07          # no skip target given: the game picks one
+NO_SEAT = 0x07
+NO_INDEX = 0xFF           # an index that can't fit a byte can't be valid either
+TURN_UNSCRIPTED = 0xFF    # no policy: the game's RNG picked the discard
+
+# Seats: 0 is the one played from the web page, the rest are computers.
+HUMAN = 0
+MIN_SEATS = 2
+MAX_SEATS = 6
+
+
+def _index_arg(index, limit=NO_INDEX):
+    return index if 0 <= index < limit else limit
+
+
+def _seat_op(code, seat):
+    return code | (seat if 0 <= seat < MAX_SEATS else NO_SEAT) << SEAT_SHIFT
+
+
+def _target_arg(target):
+    return target if target is not None and 0 <= target < MAX_SEATS else NO_TARGET
+
+
+def _action(encode):
+    """
+    Decorator for the Game methods that make up the action log. A call from
+    outside the Game appends encode(game, *args) to its log; calls one
+    action makes to another are part of it and aren't logged again.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._acting:
+                return method(self, *args, **kwargs)
+            self._acting = True
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._acting = False
+                self.action_log.extend(encode(self, *args, **kwargs))
+        return wrapper
+    return decorate
+
 
 class Game:
     PHASES = PHASES
+    # (box, box version, phase, combos) of the last solved submission box
+    _phase_attempt = None
+    # True while an action runs, so the actions it calls aren't logged twice
+    _acting = False
+    # Log entry of the computer turn in progress (see OP_COMPUTER_TURN)
+    _turn_log = (OP_COMPUTER_TURN, TURN_UNSCRIPTED)
+
+    def __init__(self, seed=None, seats=MIN_SEATS):
+        if not MIN_SEATS <= seats <= MAX_SEATS:
+            raise ValueError(f"a game has {MIN_SEATS} to {MAX_SEATS} seats, not {seats}")
+        # Every game owns its RNG so it can be snapshotted and reproduced;
+        # an unseeded game still gets a recorded seed so it can be replayed.
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.action_log = array("B")
 
-    def __init__(self):
         # Persistent game-wide state
+        # version goes up on every change to the game, so views of it can be
+        # cached and diffed per version.
+        self.version = 0
         self.round = 1
-        self.player_phase = 0
-        self.computer_phase = 0
+        self.seats = seats
+        # Phase index of each seat
+        self.phases = [0] * seats
+
+        # The draw pile's card pool is reused for every hand
+        self.deck = Deck(self.rng)
 
         # Start the first hand
         self.start_new_hand()
 
     def start_new_hand(self):
-        """Deals a new hand but does NOT reset the player's phase progress."""
-        self.deck = create_deck()
-        self.discard_pile = [self.deck.pop()]
-
-        self.player_hand = [self.deck.pop() for _ in range(10)]
-        self.computer_hand = [self.deck.pop() for _ in range(10)]
-
-        self.current_turn = "player"
+        """Deals a new hand but does NOT reset anyone's phase progress."""
+        self.version += 1
+        self.deck.reset()
+        self.discard_pile = CardList([self.deck.pop()])
+
+        self.hands = [Hand(self.deck.pop() for _ in range(10)) for _ in range(self.seats)]
+        # What each seat hasn't seen yet: everything but its own hand and the face-up card
+        self.unseen = UnseenCards(self.seats)
+        for seat, hand in enumerate(self.hands):
+            for code in hand.codes:
+                self.unseen.see(seat, code)
+        self.unseen.reveal(self.discard_pile.codes[-1])
+
+        self.turn = HUMAN
         self.has_drawn = False
-        self.skip_turn = False
-        # Instead of a flat list of cards, store combos for each player
+        # Turns each seat still has to lose to Skips played on it
+        self.skips = [0] * self.seats
+        # Instead of a flat list of cards, store combos for each seat
         # e.g. "type": "set" or "run", plus "cards": [...]
-        self.played_phases = {
-            "player": [],
-            "computer": []
-        }
-        self.phase_submission_box = [] # for the player
+        self.played_phases = [[] for _ in range(self.seats)]
+        self.hit_index = HitIndex(self.played_phases)
+        self.phase_submission_box = Hand() # for the human seat
         self.selected_card_index = None
-        # Flags indicating wheter each side has submitted their phase
-        self.phase_submitted = False
-        self.computer_phase_submitted = False
+        # Flags indicating whether each seat has submitted its phase
+        self.submitted = [False] * self.seats
+        self.assign_goals()
+
+    def assign_goals(self):
+        """Points each hand's distance-to-phase tracking at its owner's current phase."""
+        goals = [self.PHASES[phase] if phase < len(self.PHASES) else None for phase in self.phases]
+        for hand, goal in zip(self.hands, goals):
+            hand.goal = goal
+        self.phase_submission_box.goal = goals[HUMAN]
+
+    @property
+    def over(self):
+        """True once some seat has completed every phase."""
+        return max(self.phases) >= len(self.PHASES)
 
     # ------------------------------
-    # Turn / Hand Management (Player)
+    # Turn Scheduling
     # ------------------------------
-    def draw_card(self, player, from_discard=False):
-        if self.phase_submitted:
-            # Once a phase is submitted, no further drawing is allowed this turn
-            return
+    def skip_target(self, seat):
+        """Who a Skip from seat hits by default: the opponent with the fewest cards, nearest first."""
+        best = None
+        for step in range(1, self.seats):
+            other = (seat + step) % self.seats
+            if best is None or len(self.hands[other]) < len(self.hands[best]):
+                best = other
+        return best
+
+    def _advance_turn(self):
+        """Passes the turn on, using up one pending skip for every seat passed over."""
+        seat = (self.turn + 1) % self.seats
+        while self.skips[seat]:
+            self.skips[seat] -= 1
+            seat = (seat + 1) % self.seats
+        self.turn = seat
 
-        if player == "player" and self.current_turn == "player" and not self.has_drawn:
-            if from_discard and self.discard_pile:
-                self.player_hand.append(self.discard_pile.pop())
-            elif self.deck:
-                self.player_hand.append(self.deck.pop())
-            self.has_drawn = True
-
-        elif player == "computer" and self.current_turn == "computer":
-            if self.deck:
-                self.computer_hand.append(self.deck.pop())
+    # ------------------------------
+    # Turn / Hand Management
+    # ------------------------------
+    def _draw(self, seat, from_discard):
+        hand = self.hands[seat]
+        if from_discard and self.discard_pile:
+            hand.append(self.discard_pile.pop())
+        else:
+            if not self.deck:
+                self._recycle_discards()
+            if not self.deck:
+                return
+            card = self.deck.pop()
+            hand.append(card)
+            self.unseen.see(seat, card.code)
+        self.version += 1
+
+    def _recycle_discards(self):
+        """Turns the discard pile, all but its top card, into the new draw pile."""
+        codes = self.discard_pile.codes
+        if len(codes) > 1:
+            self.deck.refill(codes[:-1])
+            for code in codes[:-1]:
+                self.unseen.hide(code)
+            del codes[:-1]
+
+    @_action(lambda game, seat, from_discard=False:
+             (_seat_op(OP_DRAW, seat), bool(from_discard)))
+    def draw_card(self, seat, from_discard=False):
+        if seat != self.turn or self.has_drawn or self.submitted[seat] or self.over:
+            # One draw per turn, and once a phase is submitted no further drawing
+            return
+        self._draw(seat, from_discard)
+        self.has_drawn = True
+        self.version += 1
 
+    @_action(lambda game, card_index: (OP_SELECT, _index_arg(card_index)))
     def select_card(self, card_index):
-        if 0 <= card_index < len(self.player_hand):
+        if 0 <= card_index < len(self.hands[HUMAN]) and card_index != self.selected_card_index:
             self.selected_card_index = card_index
+            self.version += 1
 
-    def discard_selected_card(self):
-        if self.selected_card_index is not None and 0 <= self.selected_card_index < len(self.player_hand):
+    @_action(lambda game, target=None: (OP_DISCARD_SELECTED, _target_arg(target)))
+    def discard_selected_card(self, target=None):
+        if (self.turn == HUMAN and self.selected_card_index is not None
+                and 0 <= self.selected_card_index < len(self.hands[HUMAN])):
             card_index = self.selected_card_index
             self.selected_card_index = None
-            self.discard_card(card_index, player="player")
-            return True
+            return self.discard_card(card_index, HUMAN, target)
         return False
 
-    def discard_card(self, card_index, player):
-        # Remove the card from the appropriate hand and place it on the discard pile.
-        if player == "player":
-            if 0 <= card_index < len(self.player_hand):
-                card = self.player_hand.pop(card_index)
-                self.discard_pile.append(card)
-                self.has_drawn = False
-
-                # Skip card logic
-                if card.is_skip():
-                    self.skip_turn = True
-                    self.current_turn = "player"
-                else:
-                    self.current_turn = "computer"
-
-                # If the player has no cards left, round ends.
-                if not self.player_hand:
-                    self.end_round("player")
-        elif player == "computer":
-            if 0 <= card_index < len(self.computer_hand):
-                card = self.computer_hand.pop(card_index)
-                self.discard_pile.append(card)
-                # For the computer, we assume its discard turn only happens after a successful phase.
-                if not self.computer_hand:
-                    self.end_round("computer")
+    @_action(lambda game, card_index, seat, target=None:
+             (_seat_op(OP_DISCARD, seat),
+              _target_arg(target) << INDEX_BITS | _index_arg(card_index, NO_CARD)))
+    def discard_card(self, card_index, seat, target=None):
+        """
+        Discards hands[seat][card_index], ending seat's turn. A Skip makes
+        `target` (by default skip_target(seat)) lose its next turn.
+        Returns False if it isn't seat's turn, there is no such card or the
+        game is over.
+        """
+        hand = self.hands[seat] if seat == self.turn and not self.over else ()
+        if not 0 <= card_index < len(hand):
+            return False
+        card = hand.pop(card_index)
+        self.discard_pile.append(card)
+        self.unseen.reveal(card.code)
+        self.has_drawn = False
+        self.version += 1
+
+        # Skip card logic
+        if card.is_skip():
+            if target is None or target == seat or not 0 <= target < self.seats:
+                target = self.skip_target(seat)
+            self.skips[target] += 1
+
+        # If the seat has no cards left, round ends.
+        if not hand:
+            self.end_round(seat)
+        else:
+            self._advance_turn()
+        return True
 
     # Computer phase submission
-    def computer_attempt_phase(self):
+    @_action(lambda game, seat: (_seat_op(OP_ATTEMPT_PHASE, seat), 0))
+    def attempt_phase(self, seat):
         """
-        The computer examines its entire hand to see if it can complete its current phase.
-        If parse_phase_combination returns a valid combo (based on its hand and phase goal),
-        remove those cards from its hand, add the combos to played_phases["computer"],
-        and mark computer_phase_submitted as True.
+        The seat examines its entire hand to see if it can complete its current phase.
+        If solve_phase finds the combos (based on its hand and phase goal),
+        remove those cards from its hand, add the combos to played_phases[seat],
+        and mark the seat as submitted.
         """
-        phase_goal = self.PHASES[self.computer_phase]
-        combos = self.parse_phase_combination(self.computer_hand, phase_goal)
-        if combos is not None:
-            # Remove the cards used in the combos from computer_hand.
-            used_cards = []
-            for combo in combos:
-                for card in combo["cards"]:
-                    used_cards.append(card)
-            new_hand = []
-            for card in self.computer_hand:
-                if card in used_cards:
-                    used_cards.remove(card)
-                else:
-                    new_hand.append(card)
-            self.computer_hand = new_hand
-            self.played_phases["computer"].extend(combos)
-            self.computer_phase_submitted = True
+        if self.phases[seat] >= len(self.PHASES):
+            return
+        phase_goal = self.PHASES[self.phases[seat]]
+        hand = self.hands[seat]
+        solved = phase_goal.solve(hand)
+        if solved is not None:
+            # Remove the cards used in the combos from the hand by position.
+            used = []
+            combos = []
+            for combo, indices in solved:
+                combo["cards"] = [hand[i] for i in indices]
+                used.extend(indices)
+                combos.append(combo)
+            hand.remove_indices(used)
+            self.lay_combos(seat, combos)
+            self.submitted[seat] = True
+            self.version += 1
 
     # ------------------------------
     # Computer Turn Logic
     # ------------------------------
-    def computer_turn(self):
+    @metrics.timed("phase10_computer_turn_seconds", "Game.computer_turn latency")
+    @_action(lambda game, on_event=None, policy=None: game._turn_log)
+    def computer_turn(self, on_event=None, policy=None):
         """
-        The computer's turn plays similarly to the player's:
+        Plays the turn of the seat whose turn it is, the same way a person would:
          1. It first draws a card.
          2. If it hasn't submitted its phase yet, it examines its entire hand
             to see if any combination satisfies its current phase requirements.
             If so, it submits its phase.
-         3. It then discards one card.
-         4. Its turn ends, and control returns to the player.
+            Once its phase is down, it hits any cards it can onto laid combos.
+         3. It then discards one card, which passes the turn on.
+
+        If given, on_event(kind, data) is called as each step happens:
+        "draw", "phase" (with the laid combos), "hit" (with the card and the
+        target seat whose combo it went on) and "discard" (with the card);
+        every event's data has the acting "seat".
+        A policy (see bot.py) picks the draw source and the discard;
+        without one the computer draws blind and discards at random.
+        The policy's choices go into the action log, since replaying can't
+        re-run the policy itself.
         """
+        seat = self.turn
+        hand = self.hands[seat]
+        op = _seat_op(OP_COMPUTER_TURN, seat)
+
         # Step 1: Draw a card.
-        self.draw_card("computer")
-        
-        # Step 2: If the computer hasn't submitted its phase, attempt to do so.
-        if not self.computer_phase_submitted:
-            self.computer_attempt_phase()
-        
-        # Step 3: Discard one card (simulate a similar discard strategy as the player).
-        if self.computer_hand:
-            idx = random.randint(0, len(self.computer_hand) - 1)
-            self.discard_card(idx, player="computer")
-        
-        # Step 4: End turn.
-        self.current_turn = "player"
+        hand_size = len(hand)
+        from_discard = policy.choose_draw(self) if policy else False
+        self._turn_log = (op, bool(from_discard) << INDEX_BITS | NO_CARD if policy else TURN_UNSCRIPTED)
+        self._draw(seat, from_discard)
+        if on_event and len(hand) > hand_size:
+            on_event("draw", {"seat": seat, "from_discard": from_discard})
+
+        # Step 2: If the seat hasn't submitted its phase, attempt to do so.
+        if not self.submitted[seat]:
+            self.attempt_phase(seat)
+            if on_event and self.submitted[seat]:
+                on_event("phase", {"seat": seat, "combos": self.played_phases[seat]})
+
+        # Step 2b: Once laid, play off every card that fits a combo on the table.
+        if self.submitted[seat]:
+            self.dump_hits(seat, on_event)
+
+        # Step 3: Discard one card, ending the turn.
+        discarded = False
+        if hand:
+            if policy:
+                idx = policy.choose_discard(self)
+                self._turn_log = (op, bool(from_discard) << INDEX_BITS | _index_arg(idx, NO_CARD))
+            else:
+                idx = self.rng.randint(0, len(hand) - 1)
+            card = hand[idx]
+            discarded = self.discard_card(idx, seat)
+            if on_event and discarded:
+                on_event("discard", {"seat": seat, "card": card})
+        if not discarded:
+            self._advance_turn()
+            self.version += 1
 
     def end_round(self, winner):
         # Winner advances phase
-        if winner == "player":
-            self.player_phase += 1
-        else:
-            self.computer_phase += 1
-
+        self.phases[winner] += 1
         self.round += 1
         self.start_new_hand()
 
     # ------------------------------
-    # Phase Submission (Sets + Runs) (Player)
+    # Phase Submission (Sets + Runs) (Human seat)
     # ------------------------------
 
+    @_action(lambda game, card_index: (OP_ADD_TO_PHASE, _index_arg(card_index)))
     def add_to_phase_attempt(self, card_index):
-        if 0 <= card_index < len(self.player_hand):
-            card = self.player_hand.pop(card_index)
+        hand = self.hands[HUMAN]
+        if 0 <= card_index < len(hand):
+            card = hand.pop(card_index)
             self.phase_submission_box.append(card)
+            self.version += 1
 
+    @_action(lambda game, card_index: (OP_REMOVE_FROM_PHASE, _index_arg(card_index)))
     def remove_from_phase_attempt(self, card_index):
         if 0 <= card_index < len(self.phase_submission_box):
             card = self.phase_submission_box.pop(card_index)
-            self.player_hand.append(card)
+            self.hands[HUMAN].append(card)
+            self.version += 1
+
+    def phase_attempt(self):
+        """
+        The combos the submission box makes for the human seat's current
+        phase, or None. Solved once per box version and phase, so
+        re-rendering the page while nothing moved costs nothing. Always None
+        once the seat has played every phase.
+        """
+        box = self.phase_submission_box
+        phase = self.phases[HUMAN]
+        if phase >= len(self.PHASES):
+            return None
+        cached = self._phase_attempt
+        if cached is None or cached[0] is not box or cached[1] != box.version or cached[2] != phase:
+            combos = self.parse_phase_combination(box, self.PHASES[phase])
+            cached = self._phase_attempt = (box, box.version, phase, combos)
+        return cached[3]
+
+    def phase_distance(self):
+        """
+        Cards the human seat is still missing for its phase, counting the
+        submission box along with the hand (moving cards between them
+        changes nothing). None once it has no phase left.
+        """
+        hand, box = self.hands[HUMAN], self.phase_submission_box
+        if hand.goal is None or not box:
+            return hand.distance
+        hist = tuple(held + boxed for held, boxed in zip(hand.counts, box.counts))
+        colors = tuple(held + boxed for held, boxed in zip(hand.colors, box.colors))
+        return hand.goal.missing(hist, colors)
 
     def check_phase_attempt(self):
         """
         Returns True if the cards in self.phase_submission_box satisfy
-        the player's current phase (e.g. Phase 1 => 2 sets of 3,
+        the human seat's current phase (e.g. Phase 1 => 2 sets of 3,
         Phase 2 => 1 set of 3 and 1 run of 4, etc.).
-        
-        For demonstration, this method only checks:
-          - Phase 1 (2 sets of 3)
-          - Phase 2 (1 set of 3 + 1 run of 4)
-          - Phase 3 (1 set of 4 + 1 run of 4)
-          - Phase 4-6 (Run-only phases with required len of 7,8,9)
         """
-        phase_goal = self.PHASES[self.player_phase]
-        combos = self.parse_phase_combination(self.phase_submission_box, phase_goal)
-        return combos is not None
+        return self.phase_attempt() is not None
 
+    @_action(lambda game: (OP_SUBMIT_PHASE, 0))
     def submit_phase(self):
         """
-        If the submission box satisfies the player's current phase,
-        store these combos in played_phases["player"] and clear the submission box.
+        If the submission box satisfies the human seat's current phase,
+        store these combos in played_phases[HUMAN] and clear the submission box.
         """
-        phase_goal = self.PHASES[self.player_phase]
-        combos = self.parse_phase_combination(self.phase_submission_box, phase_goal)
+        combos = self.phase_attempt() if not self.over else None
         if combos is not None:
             # Successful
-            self.played_phases["player"].extend(combos)
+            self._phase_attempt = None
+            self.lay_combos(HUMAN, combos)
             self.phase_submission_box.clear()
-            self.phase_submitted = True
+            self.submitted[HUMAN] = True
+            self.version += 1
 
     # ------------------------------
     # Parsing a Combination of Cards
     # into the required sets/runs
     # ------------------------------
+    @metrics.timed("phase10_parse_phase_seconds", "Game.parse_phase_combination latency")
     def parse_phase_combination(self, cards, phase_goal):
         """
         Attempt to partition 'cards' into combos that satisfy 'phase_goal'.
         If successful, return a list of combos (each combo is a dict).
         If not, return None.
-        
-        Currently only handles:
-          - Phase 1: 2 sets of 3
-          - Phase 2: 1 set of 3 + 1 run of 4
-        """
-        sets_needed = phase_goal.get("sets", 0)
-        set_size = phase_goal.get("set_size", 0)
-        run_length = phase_goal.get("run", 0)
-
-
-        # Convert to a list so we can manipulate
-        card_list = list(cards)
-
-        # If Phase 1: 2 sets of 3
-        if sets_needed == 2 and set_size == 3 and run_length == 0:
-            combos = self._try_form_two_sets_of_three(card_list)
-            return combos
-
-        # If Phase 2: 1 set of 3 + 1 run of 4
-        if sets_needed == 1 and set_size == 3 and run_length == 4:
-            combos = self._try_form_one_set_and_one_run(card_list)
-            return combos
-
-        # If Phase 3: 1 set of 4 and 1 run of 4
-        if sets_needed == 1 and set_size == 4 and run_length == 4:
-            combos = self._try_form_one_set_and_one_run3(card_list)
-            return combos
-
-        # If Phase 4-6: no set requirement only a run
-        if sets_needed == 0 and run_length > 0:
-            success, used_run, run_cards_sorted = self._can_form_run(card_list, run_length)
-            if success:
-                return [{"type": "run", "cards": run_cards_sorted}]
-            else:
-                return None
-
-        # Otherwise, not implemented yet
-        return None
 
-    def _try_form_two_sets_of_three(self, card_list):
-        """
-        Try to form exactly 2 sets of 3 from the card_list.
-        Return a list of combos if successful, else None.
+        phase_goal is a compiled phase (an entry of PHASES, or see
+        compile_phase), so this goes straight to its solver; the answer is
+        exact and memoized per hand.
         """
-        if len(card_list) < 6:
-            return None
-
-        # First set
-        success1, used1, set_num1 = self._can_form_set(card_list, 3)
-        if not success1:
+        card_list = cards if isinstance(cards, CardList) else list(cards)
+        solved = phase_goal.solve(card_list)
+        if solved is None:
             return None
-        # Remove used1 from card_list
-        leftover1 = [c for i, c in enumerate(card_list) if i not in used1]
-
-        # Second set
-        success2, used2, set_num2 = self._can_form_set(leftover1, 3)
-        if not success2:
-            return None
-
-        # Build combos
-        set_cards_1 = [card_list[i] for i in used1]
-        set_cards_2 = []
-        # used2 are indices into leftover1, so we need to map them back
-        # leftover1 was the subset, we must figure out which indices in leftover1
-        # correspond to which indices in card_list
-        leftover_map = []
-        used_in_card_list = set(used1)
-        for i, c in enumerate(card_list):
-            if i not in used_in_card_list:
-                leftover_map.append(i)  # track original indices
-
-        real_indices_2 = [leftover_map[i] for i in used2]
-        set_cards_2 = [card_list[i] for i in real_indices_2]
-
-        combos = [
-            {"type": "set", "cards": set_cards_1, "number": set_num1},
-            {"type": "set", "cards": set_cards_2, "number": set_num2},
-        ]
-        return combos
-
-    def _try_form_one_set_and_one_run(self, card_list):
-        """
-        Try to form exactly 1 set of 3 and 1 run of 4 from card_list.
-        Return a list of combos if successful, else None.
-        """
-        if len(card_list) < 7:
-            return None
-
-        # Attempt set first, then run
-        success_set, used_set, set_num = self._can_form_set(card_list, 3)
-        if success_set:
-            leftover1 = [c for i, c in enumerate(card_list) if i not in used_set]
-            success_run, used_run, run_cards_sorted = self._can_form_run(leftover1, 4)
-            if success_run:
-                # Build combos
-                set_cards = [card_list[i] for i in used_set]
-                # used_run are indices into leftover1
-                leftover_map = []
-                used_in_card_list = set(used_set)
-                for i, c in enumerate(card_list):
-                    if i not in used_in_card_list:
-                        leftover_map.append(i)
-                real_indices_run = [leftover_map[i] for i in used_run]
-                run_cards = [card_list[i] for i in real_indices_run]
-
-                combos = [
-                    {"type": "set", "cards": set_cards, "number": set_num},
-                    {"type": "run", "cards": run_cards_sorted},
-                ]
-                return combos
-
-        # Try run first, then set
-        success_run, used_run, run_cards_sorted = self._can_form_run(card_list, 4)
-        if success_run:
-            leftover2 = [c for i, c in enumerate(card_list) if i not in used_run]
-            success_set, used_set, set_num = self._can_form_set(leftover2, 3)
-            if success_set:
-                run_map = []
-                used_in_card_list = set(used_run)
-                for i, c in enumerate(card_list):
-                    if i not in used_in_card_list:
-                        run_map.append(i)
-                real_indices_set = [run_map[i] for i in used_set]
-                set_cards = [card_list[i] for i in real_indices_set]
-
-                combos = [
-                    {"type": "run", "cards": run_cards_sorted},
-                    {"type": "set", "cards": set_cards, "number": set_num},
-                ]
-                return combos
-
-        return None
-
-    def _try_form_one_set_and_one_run3(self, card_list):
-        """
-        Try to form exactly 1 set of 4 and 1 run of 4 from card_list.
-        Return a list of combos if successful, else None.
-        """
-        if len(card_list) < 8:
-            return None
-
-        # Attempt set first, then run
-        success_set, used_set, set_num = self._can_form_set(card_list, 4)
-        if success_set:
-            leftover1 = [c for i, c in enumerate(card_list) if i not in used_set]
-            success_run, used_run, run_cards_sorted = self._can_form_run(leftover1, 4)
-            if success_run:
-                # Build combos
-                set_cards = [card_list[i] for i in used_set]
-                # used_run are indices into leftover1
-                leftover_map = []
-                used_in_card_list = set(used_set)
-                for i, c in enumerate(card_list):
-                    if i not in used_in_card_list:
-                        leftover_map.append(i)
-                real_indices_run = [leftover_map[i] for i in used_run]
-                run_cards = [card_list[i] for i in real_indices_run]
-
-                combos = [
-                    {"type": "set", "cards": set_cards, "number": set_num},
-                    {"type": "run", "cards": run_cards_sorted},
-                ]
-                return combos
-
-        # Try run first, then set
-        success_run, used_run, run_cards_sorted = self._can_form_run(card_list, 4)
-        if success_run:
-            leftover2 = [c for i, c in enumerate(card_list) if i not in used_run]
-            success_set, used_set, set_num = self._can_form_set(leftover2, 4)
-            if success_set:
-                run_map = []
-                used_in_card_list = set(used_run)
-                for i, c in enumerate(card_list):
-                    if i not in used_in_card_list:
-                        run_map.append(i)
-                real_indices_set = [run_map[i] for i in used_set]
-                set_cards = [card_list[i] for i in real_indices_set]
-
-                combos = [
-                    {"type": "run", "cards": run_cards_sorted},
-                    {"type": "set", "cards": set_cards, "number": set_num},
-                ]
-                return combos
-
-        return None
+        return [dict(combo, cards=[card_list[i] for i in indices])
+                for combo, indices in solved]
 
     # ------------------------------
     # Helper: _can_form_set
@@ -443,34 +1401,11 @@ class Game:
         Returns (True, used_indices, set_number) if success, else (False, [], None).
         A 'set' is all the same number, plus any wilds as needed.
         """
-        from collections import defaultdict
-
-        # Indices of wilds
-        wild_indices = []
-        normal_map = defaultdict(list)  # number -> list of indices
-
-        for i, c in enumerate(cards_list):
-            if c.is_wild():
-                wild_indices.append(i)
-            else:
-                normal_map[c.number].append(i)
-
-        # Check each number to see if we can form a set
-        for number, idx_list in normal_map.items():
-            count = len(idx_list)
-            if count >= size:
-                # We have enough real cards
-                used = idx_list[:size]
-                return True, used, number
-            else:
-                needed = size - count
-                if needed <= len(wild_indices):
-                    # We can fill with wilds
-                    used = idx_list[:]  # all real cards
-                    used += wild_indices[:needed]
-                    return True, used, number
-
-        return False, [], None
+        deficit, _, plan = solve_groups((size,), 0, hand_histogram(cards_list))
+        if deficit:
+            return False, [], None
+        used = assign_group_indices(cards_list, (size,), 0, plan)[0]
+        return True, used, plan[0][0]
 
     # ------------------------------
     # Helper: _can_form_run
@@ -480,115 +1415,301 @@ class Game:
         Tries to form a consecutive run of `length` using wilds.
         Returns (True, used_indices, sorted_cards_for_run) if success,
         else (False, [], []).
-        
+
         Example: run of 4 could be [4,5,Wild,7].
         Color is irrelevant, only numeric sequence matters.
+        The returned cards are in run order, wilds sitting in the gaps they fill.
         """
-        import itertools
-
-        if len(cards_list) < length:
+        deficit, _, plan = solve_groups((), length, hand_histogram(cards_list))
+        if deficit:
             return False, [], []
+        used = assign_group_indices(cards_list, (), length, plan)[-1]
+        return True, used, [cards_list[i] for i in used]
 
-        indices = list(range(len(cards_list)))
-        # We'll try all combinations of exactly `length` cards
-        for combo in itertools.combinations(indices, length):
-            combo_cards = [cards_list[i] for i in combo]
-            # Count how many are wild
-            wild_count = sum(1 for c in combo_cards if c.is_wild())
-            # Extract real numbers
-            real_nums = sorted([c.number for c in combo_cards if not c.is_wild()])
-
-            if not real_nums:
-                # All wild? Then we can form a run of anything, but let's assume
-                # we need at least 1 real number to anchor. (Up to you to define.)
-                continue
-
-            min_num = real_nums[0]
-            max_num = real_nums[-1]
-            needed_gaps = (max_num - min_num + 1) - len(real_nums)
-            # E.g. real_nums=[4,5,7], min=4, max=7 => gap=4 => need 1 to fill '6'
-
-            # If the total range is bigger than we can fill with wilds, fail
-            if (max_num - min_num + 1) > length:
+    # ------------------------------
+    # Laying and Hitting
+    # ------------------------------
+    def lay_combos(self, seat, combos):
+        """Puts combos down in front of seat and indexes them for hits."""
+        laid = self.played_phases[seat]
+        for combo in combos:
+            laid.append(summarize_combo(combo))
+            self.hit_index.update(seat, len(laid) - 1, combo)
+            for card in combo["cards"]:
+                self.unseen.reveal(card.code)
+
+    def _hit(self, seat, hand, card_index):
+        """
+        Plays hand[card_index] onto the first combo it fits: seat's own
+        combos first, then the other seats' in turn order. Returns the
+        seat hit, or None.
+        """
+        target = self._hit_target(seat, hand[card_index])
+        if target is None:
+            return None
+        target_seat, position = target
+        combo = self.played_phases[target_seat][position]
+        card = hand.pop(card_index)
+        extend_combo(combo, card)
+        self.unseen.reveal(card.code)
+        self.hit_index.update(target_seat, position, combo)
+        self.version += 1
+        return target_seat
+
+    def _hit_target(self, seat, card):
+        order = [(seat + step) % self.seats for step in range(self.seats)]
+        return self.hit_index.find(card, order)
+
+    @_action(lambda game, card_index: (OP_HIT, _index_arg(card_index)))
+    def hit_existing_phase(self, card_index):
+        """
+        Add a single card from hands[HUMAN][card_index] to a laid combo, the
+        human's own or any other seat's, if it fits:
+          - a set takes its number or a wild
+          - a run takes the number just below or above it (never past 1 or 12) or a wild
+          - a color combo takes its color or a wild
+        The human must have laid their own phase first, and the game must
+        still be on. Returns True on a hit.
+        """
+        hand = self.hands[HUMAN]
+        if not 0 <= card_index < len(hand) or not self.played_phases[HUMAN] or self.over:
+            return False
+        hit = self._hit(HUMAN, hand, card_index) is not None
+        if hit and not hand:
+            self.end_round(HUMAN)
+        return hit
+
+    @_action(lambda game, seat, on_event=None: (_seat_op(OP_DUMP_HITS, seat), 0))
+    def dump_hits(self, seat, on_event=None):
+        """
+        Hits every card of seat's hand that fits a laid combo, keeping one
+        card back for the discard. Returns the number of cards played.
+        """
+        hand = self.hands[seat]
+        played = 0
+        i = 0
+        while i < len(hand) and len(hand) > 1:
+            card = hand[i]
+            target_seat = self._hit(seat, hand, i)
+            if target_seat is None:
+                i += 1
                 continue
-
-            # If we can fill the gaps with the available wilds
-            if needed_gaps <= wild_count and (max_num - min_num + 1) <= (length + wild_count):
-                # Sort the actual cards for returning
-                used_indices = list(combo)
-                # Reconstruct the final run in ascending order
-                # For display, you might want the real numbers in ascending order
-                run_sorted = sorted(combo_cards, key=lambda c: (c.is_wild(), c.number if not c.is_wild() else 999))
-                return True, used_indices, run_sorted
-
-        return False, [], []
+            played += 1
+            i = 0  # an extended run may now take a card that was passed over
+            if on_event:
+                on_event("hit", {"seat": seat, "card": card, "target": target_seat})
+        return played
 
     # ------------------------------
-    # Hitting Logic
+    # Lookahead
     # ------------------------------
-    def hit_existing_phase(self, card_index):
+    # make() plays a move in place and returns an undo record; unmake(undo)
+    # puts back exactly the state the move touched, in reverse order of the
+    # makes. A search can then walk thousands of positions on one Game:
+    # ordinary moves save a few scalars and indices, and only a move that
+    # ends the hand keeps the outgoing hand's objects (start_new_hand swaps
+    # in new ones, so keeping the old references costs no copying).
+    def make(self, move):
         """
-        Add a single card from player_hand[card_index] to one of the combos
-        in played_phases["player"], if it is valid to do so.
-        Minimal example:
-          - If combo is a set => same number or wild
-          - If combo is a run => extend from left or right by 1 or wild
+        Plays move, one of
+            ("draw", seat, from_discard)
+            ("discard", seat, card_index, skip_target_or_None)
+            ("lay", seat)            # attempt_phase
+            ("hit", seat, card_index)
+        under the same rules as the matching action (a computer seat draws as
+        in computer_turn; an illegal move changes nothing), without writing it to the action log. Returns the undo
+        record for unmake().
         """
-        if 0 <= card_index < len(self.player_hand):
-            card = self.player_hand[card_index]
-
-            # Must have laid your phase first to have combos
-            if not self.played_phases["player"]:
-                return  # no combos to hit
-
-            for combo in self.played_phases["player"]:
-                if combo["type"] == "set":
-                    # If the set is all number X (plus wilds), we can add this card
-                    # if it is wild or matches X
-                    set_number = self._get_set_number(combo["cards"])
-                    if set_number is not None:
-                        if card.is_wild() or (not card.is_wild() and card.number == set_number):
-                            # Add to set
-                            combo["cards"].append(card)
-                            self.player_hand.pop(card_index)
-                            return
-                elif combo["type"] == "run":
-                    # Minimal approach: check if we can place it at either end
-                    # For example, if run is [6,7,8], we can add a 5 or 9 or a Wild
-                    # For a robust approach, you'd handle wild insertion or big runs
-                    run_cards = combo["cards"]
-                    # Sort them by actual number (wilds last)
-                    run_nums = sorted([c.number for c in run_cards if not c.is_wild()])
-                    if not run_nums:
-                        continue
-                    low = min(run_nums)
-                    high = max(run_nums)
-                    # If card is wild, we can place it on either end
-                    if card.is_wild():
-                        run_cards.append(card)
-                        self.player_hand.pop(card_index)
-                        return
-                    else:
-                        # If card.number == low - 1 or high + 1
-                        if card.number == low - 1 or card.number == high + 1:
-                            run_cards.append(card)
-                            self.player_hand.pop(card_index)
-                            return
-
-            # If we get here, we couldn't add the card to any combo
-            return
+        kind, seat = move[0], move[1]
+        base = (kind, seat, self.version, self.turn, self.has_drawn, tuple(self.skips))
+        acting = self._acting
+        self._acting = True
+        try:
+            if kind == "draw":
+                extra = self._make_draw(seat, move[2])
+            elif kind == "discard":
+                extra = self._make_discard(seat, move[2], move[3])
+            elif kind == "lay":
+                extra = self._make_lay(seat)
+            elif kind == "hit":
+                extra = self._make_hit(seat, move[2])
+            else:
+                raise ValueError(f"unknown move {kind!r}")
+        finally:
+            self._acting = acting
+        return base + (extra,)
+
+    def unmake(self, undo):
+        """Takes back the move make() returned undo for."""
+        kind, seat, version, turn, has_drawn, skips, extra = undo
+        if extra is not None:
+            if kind == "draw":
+                self._unmake_draw(seat, *extra)
+            elif kind == "discard":
+                self._unmake_discard(*extra)
+            elif kind == "lay":
+                self._unmake_lay(seat, *extra)
+            else:
+                self._unmake_hit(*extra)
+        self.version = version
+        self.turn = turn
+        self.has_drawn = has_drawn
+        self.skips = list(skips)
 
-    def _get_set_number(self, cards):
+    def clone(self):
         """
-        Given a list of cards forming a set, find the 'number' 
-        ignoring wilds. Return None if ambiguous.
+        An independent copy of the game, action log and RNG included, built
+        from the card code arrays rather than by deepcopy's walk of every
+        object.
         """
-        real_numbers = [c.number for c in cards if not c.is_wild()]
-        if not real_numbers:
+        other = Game.__new__(Game)
+        other.__dict__.update(self.__dict__)
+        other.rng = random.Random()
+        other.rng.setstate(self.rng.getstate())
+        other.action_log = array("B", self.action_log)
+        other.phases = list(self.phases)
+        other.submitted = list(self.submitted)
+        other.skips = list(self.skips)
+        other.deck = Deck(other.rng, self.deck.codes)
+        other.discard_pile = CardList.from_codes(self.discard_pile.codes)
+        other.hands = [Hand.from_codes(hand.codes) for hand in self.hands]
+        other.phase_submission_box = Hand.from_codes(self.phase_submission_box.codes)
+        other.played_phases = [[dict(combo, cards=list(combo["cards"])) for combo in combos]
+                               for combos in self.played_phases]
+        other.hit_index = HitIndex(other.played_phases)
+        other.unseen = self.unseen.copy()
+        other.assign_goals()
+        return other
+
+    def _hand_state(self):
+        """Everything a hand-ending move replaces or rewrites, for unmake()."""
+        return (self.hands, self.played_phases, self.hit_index, self.unseen, self.phase_submission_box,
+                self.selected_card_index, self._phase_attempt, self.submitted, self.discard_pile,
+                self.deck.codes, tuple(self.phases), self.round, self.rng.getstate())
+
+    def _restore_hand_state(self, state):
+        (self.hands, self.played_phases, self.hit_index, self.unseen, self.phase_submission_box,
+         self.selected_card_index, self._phase_attempt, self.submitted, self.discard_pile,
+         deck_codes, phases, self.round, rng_state) = state
+        self.deck.refill(deck_codes)
+        self.phases[:] = phases
+        self.rng.setstate(rng_state)
+
+    def _make_draw(self, seat, from_discard):
+        hand = self.hands[seat]
+        hand_size, hand_version = len(hand), hand.version
+        from_pile = bool(from_discard and self.discard_pile)
+        deck = self.deck
+        recycled = 0
+        last = None
+        rng_state = None
+        if not from_pile:
+            # The card the deck's swap-pop will move into the drawn card's slot
+            if deck:
+                last = deck.pool[deck.size - 1]
+            elif len(self.discard_pile) > 1:
+                recycled = len(self.discard_pile)
+                last = self.discard_pile.codes[-2]
+            rng_state = self.rng.getstate()
+        if seat == HUMAN:
+            self.draw_card(seat, from_discard)
+        elif seat == self.turn and not self.over:
+            # A computer seat draws the way computer_turn has it: every turn, laid phase or not.
+            self._draw(seat, from_discard)
+        if len(hand) == hand_size:
             return None
-        # If the set is valid, they should all be the same real number
-        first = real_numbers[0]
-        for num in real_numbers:
-            if num != first:
-                return None
-        return first
+        return hand_version, from_pile, last, recycled, rng_state
+
+    def _unmake_draw(self, seat, hand_version, from_pile, last, recycled, rng_state):
+        hand = self.hands[seat]
+        card = hand.pop()
+        hand.version = hand_version
+        if from_pile:
+            self.discard_pile.append(card)
+            return
+        self.unseen.hide(card.code)
+        deck = self.deck
+        pool = deck.pool
+        size = deck.size
+        if card.code != last:
+            pool[pool.index(last, 0, size)] = card.code
+        pool[size] = last
+        deck.size = size + 1
+        if recycled:
+            self.discard_pile.codes[0:0] = pool[:recycled - 1]
+            deck.size = 0
+            for code in pool[:recycled - 1]:
+                self.unseen.reveal(code)
+        self.rng.setstate(rng_state)
+
+    def _make_discard(self, seat, card_index, target):
+        hand = self.hands[seat]
+        if seat != self.turn or not 0 <= card_index < len(hand):
+            return None
+        hand_version = hand.version
+        seen_by = self.unseen.seen_by[hand.codes[card_index]]
+        state = self._hand_state() if len(hand) == 1 else None
+        self.discard_card(card_index, seat, target)
+        return hand, hand_version, card_index, seen_by, state
+
+    def _unmake_discard(self, hand, hand_version, card_index, seen_by, state):
+        if state is not None:
+            self._restore_hand_state(state)
+        card = self.discard_pile.pop()
+        self.unseen.set(card.code, seen_by)
+        hand.insert(card_index, card)
+        hand.version = hand_version
+
+    def _make_lay(self, seat):
+        if self.submitted[seat]:
+            return None
+        hand = self.hands[seat]
+        codes, hand_version = array("B", hand.codes), hand.version
+        seen_by = bytes(self.unseen.seen_by[code] for code in codes)
+        laid = len(self.played_phases[seat])
+        self.attempt_phase(seat)
+        if not self.submitted[seat]:
+            return None
+        return codes, seen_by, hand_version, laid
+
+    def _unmake_lay(self, seat, codes, seen_by, hand_version, laid):
+        combos = self.played_phases[seat]
+        for position in range(laid, len(combos)):
+            self.hit_index.remove(seat, position)
+        del combos[laid:]
+        hand = self.hands[seat]
+        hand.clear()
+        for code, mask in zip(codes, seen_by):
+            hand.append(CARDS[code])
+            self.unseen.set(code, mask)
+        hand.version = hand_version
+        self.submitted[seat] = False
+
+    def _make_hit(self, seat, card_index):
+        hand = self.hands[seat]
+        if not 0 <= card_index < len(hand) or not self.played_phases[seat]:
+            return None
+        target = self._hit_target(seat, hand[card_index])
+        if target is None:
+            return None
+        combo = self.played_phases[target[0]][target[1]]
+        low, high = combo.get("low"), combo.get("high")
+        hand_version = hand.version
+        seen_by = self.unseen.seen_by[hand.codes[card_index]]
+        state = self._hand_state() if len(hand) == 1 else None
+        self._hit(seat, hand, card_index)
+        if not hand:
+            self.end_round(seat)
+        return hand, hand_version, card_index, seen_by, target, combo, low, high, state
+
+    def _unmake_hit(self, hand, hand_version, card_index, seen_by, target, combo, low, high, state):
+        if state is not None:
+            self._restore_hand_state(state)
+        cards = combo["cards"]
+        card = cards.pop(0) if low is not None and combo["low"] != low else cards.pop()
+        if low is not None:
+            combo["low"], combo["high"] = low, high
+        self.hit_index.update(target[0], target[1], combo)
+        self.unseen.set(card.code, seen_by)
+        hand.insert(card_index, card)
+        hand.version = hand_version
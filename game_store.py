@@ -0,0 +1,129 @@
+"""
+In-process registry of independent games, one per browser session.
+
+Every game has its own lock, so concurrent requests against the same table
+are serialized while different tables never contend. Idle games expire after
+a TTL and the least recently used ones are evicted once the store reaches its
+cap, which bounds memory at roughly max_games times the size of one Game.
+
+Without a backing store the registry lives in the worker process, so under
+a multi-process WSGI server sessions need to stick to a worker. With a
+snapshot.SnapshotStore as backing, every checkout first makes sure the cached
+game is the latest snapshot (reloading it if another worker saved since) and
+saves it again afterwards if it changed, all under a lock the backing store
+holds across processes, so any worker can serve any game.
+"""
+import collections
+import contextlib
+import threading
+import time
+
+from game_logic import Game
+
+
+class _Entry:
+    __slots__ = ("game", "lock", "depth", "last_used", "version")
+
+    def __init__(self, game, now):
+        self.game = game
+        self.lock = threading.RLock()
+        self.depth = 0  # nested checkouts holding lock
+        self.last_used = now
+        self.version = None  # backing-store version this copy corresponds to
+
+
+class GameStore:
+    def __init__(self, max_games=10000, ttl_seconds=3600, factory=Game, clock=time.monotonic,
+                 backing=None):
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self.factory = factory
+        self.clock = clock
+        self.backing = backing
+        self._entries = collections.OrderedDict()  # game_id -> _Entry, LRU first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, game_id):
+        return game_id in self._entries
+
+    @contextlib.contextmanager
+    def checkout(self, game_id):
+        """
+        Yields the game for game_id (creating it if needed) while holding its
+        lock, so the body of the with-block has exclusive use of it. It is
+        saved back only if the block changed it (or it was never saved), so
+        read-only requests don't grow the backing store.
+        """
+        entry = self._entry(game_id)
+        with entry.lock:
+            # The backing store's cross-process lock is taken once, by the outermost checkout.
+            outer = self.backing is not None and entry.depth == 0
+            entry.depth += 1
+            try:
+                with self.backing.locked(game_id) if outer else contextlib.nullcontext():
+                    if self.backing is not None:
+                        self._sync(game_id, entry)
+                    game = entry.game
+                    version = game.version
+                    yield game
+                    entry.last_used = self.clock()
+                    if self.backing is not None and (entry.version is None or entry.game is not game
+                                                     or game.version != version):
+                        self.backing.save(game_id, entry.game)
+                        entry.version = self.backing.version(game_id)
+            finally:
+                entry.depth -= 1
+
+    def discard(self, game_id):
+        """Drops a game; the next checkout of game_id starts a fresh one."""
+        entry = self._entry(game_id)
+        with entry.lock:
+            if self.backing is not None:
+                with self.backing.locked(game_id) if entry.depth == 0 else contextlib.nullcontext():
+                    self.backing.delete(game_id)
+            # Anyone already waiting on this entry gets a fresh game too.
+            entry.game = self.factory()
+            entry.version = None
+            with self._lock:
+                if self._entries.get(game_id) is entry:
+                    del self._entries[game_id]
+
+    def _sync(self, game_id, entry):
+        """Swaps in the backing store's copy if it is newer than ours."""
+        version = self.backing.version(game_id)
+        if version is not None and version != entry.version:
+            entry.game = self.backing.load(game_id)
+            entry.version = version
+
+    def _entry(self, game_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is None:
+                entry = self._entries[game_id] = _Entry(self.factory(), now)
+                self._evict(now, keep=game_id)
+            else:
+                entry.last_used = now
+                self._entries.move_to_end(game_id)
+            return entry
+
+    def _evict(self, now, keep=None):
+        """
+        Drops expired games and then the least recently used ones until the
+        store is back under max_games. Games checked out right now are kept.
+        Called with self._lock held.
+        """
+        expired = now - self.ttl_seconds
+        for game_id, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_games and entry.last_used > expired:
+                break
+            if game_id == keep:
+                continue
+            if entry.lock.acquire(blocking=False):
+                try:
+                    del self._entries[game_id]
+                finally:
+                    entry.lock.release()
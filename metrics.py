@@ -0,0 +1,223 @@
+"""
+Opt-in latency histograms and counters, served as Prometheus text at /metrics.
+
+Set PHASE10_METRICS=1 to turn instrumentation on. It is decided once at
+import: when off, timed(), tallied() and counted() hand back the undecorated function
+and the web hooks are never registered, so a disabled build runs exactly the
+code it would without this module.
+
+    @metrics.timed("phase10_parse_phase_seconds", "parse_phase_combination latency")
+    def parse_phase_combination(self, cards, phase_goal): ...
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("PHASE10_METRICS", "") not in ("", "0")
+
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Tally(threading.local):
+    """Per-thread running count, so a caller can see how much of it one call used."""
+    value = 0
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._get(Histogram, name, documentation, buckets, labelnames)
+
+    def collector(self, collect):
+        """Adds collect(), returning exposition lines, to be called at every scrape."""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def timed(name, documentation, tally=None, tally_name=None, tally_documentation=None):
+    """
+    Decorator recording each call's latency in histogram `name`. With a
+    Tally, also records how far the tally advanced during the call in
+    histogram `tally_name`. Returns the function untouched when disabled.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        latency = REGISTRY.histogram(name, documentation)
+        work = REGISTRY.histogram(tally_name, tally_documentation, COUNT_BUCKETS) if tally else None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            before = tally.value if tally else 0
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                latency.observe(time.perf_counter() - start)
+                if tally:
+                    work.observe(tally.value - before)
+        return wrapper
+    return decorate
+
+
+def tallied(tally):
+    """Decorator adding one to `tally` per call. Returns the function untouched when disabled."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tally.value += 1
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def counted(name, documentation, labelname, label):
+    """
+    Decorator adding one per call to counter `name`, labelled by `label`, or
+    by label(result) for a callable. Returns the function untouched when disabled.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        counter = REGISTRY.counter(name, documentation, (labelname,))
+        label_of = label if callable(label) else lambda result: label
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            counter.inc(labels=(label_of(result),))
+            return result
+        return wrapper
+    return decorate
+
+
+def cache_collector(name, documentation, cached):
+    """Exposes an lru_cache's hit/miss totals as a counter, read only at scrape time."""
+    def collect():
+        info = cached.cache_info()
+        return [f"# HELP {name} {documentation}", f"# TYPE {name} counter",
+                f'{name}{{result="hit"}} {info.hits}', f'{name}{{result="miss"}} {info.misses}']
+    if ENABLED:
+        REGISTRY.collector(collect)
+    return collect
+
+
+def install_flask(app):
+    """Times every request by endpoint and status, and serves /metrics. No-op when disabled."""
+    if not ENABLED:
+        return
+    from flask import Response, g, request
+
+    requests = REGISTRY.histogram("phase10_http_request_seconds", "Flask request latency",
+                                  labelnames=("endpoint", "method", "status"))
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            requests.observe(time.perf_counter() - start,
+                             (request.endpoint or "unknown", request.method, response.status_code))
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,135 @@
+"""
+Vectorized phase evaluation for many hands at once.
+
+A hand is a row of a N x 13 histogram matrix (numbers 1..12, then wilds,
+the same layout as game_logic.hand_histogram) and, for color phases, a row of
+a N x 4 color-count matrix. batch_missing scores a PHASES entry against every
+row in one pass of NumPy array operations, using the same allocation rules
+as the scalar solver, so results agree with game_logic.phase_deficit.
+table_missing answers the same question from a compiled phase's precomputed
+game_logic.PhaseTable, ranking every row at once.
+"""
+import functools
+
+import numpy as np
+
+from game_logic import (
+    COLORS, NUMBERS, WILD_SLOT, _set_slot_choices, color_counts, hand_histogram, phase_requirements,
+)
+
+
+def histogram_matrix(hands):
+    """Stacks the 13-slot histograms of an iterable of hands into a N x 13 array."""
+    return np.array([hand_histogram(hand) for hand in hands], dtype=np.int16).reshape(-1, 13)
+
+
+def color_matrix(hands):
+    """Stacks the per-color counts of an iterable of hands into a N x 4 array."""
+    return np.array([color_counts(hand) for hand in hands], dtype=np.int16).reshape(-1, len(COLORS))
+
+
+def batch_missing(phase_goal, hists, colors=None):
+    """
+    Returns, for every row, how many more cards the hand needs before it can
+    lay phase_goal (0 means it can lay it now). Color phases need `colors`.
+    """
+    hists = np.asarray(hists, dtype=np.int16)
+    if hists.ndim != 2 or hists.shape[1] != 13:
+        raise ValueError(f"expected a N x 13 histogram matrix, got shape {hists.shape}")
+    wilds = hists[:, WILD_SLOT]
+
+    color_size = phase_goal.get("color", 0)
+    if color_size:
+        if colors is None:
+            raise ValueError("color phases need the N x 4 color-count matrix")
+        best = np.asarray(colors, dtype=np.int16).max(axis=1)
+        unfilled = color_size - np.minimum(best, color_size)
+        return np.maximum(np.maximum(unfilled - wilds, best == 0), 0)
+
+    set_sizes, run_length = phase_requirements(phase_goal)
+    numbers_held = hists[:, :12]
+    total = sum(set_sizes) + run_length
+
+    if run_length:
+        present = np.zeros((hists.shape[0], 13), dtype=np.int16)
+        np.cumsum(numbers_held > 0, axis=1, out=present[:, 1:])
+        windows = [(start, present[:, start - 1 + run_length] - present[:, start - 1])
+                   for start in range(1, 14 - run_length)]
+    else:
+        windows = [(None, np.zeros(hists.shape[0], dtype=np.int16))]
+
+    best = None
+    for start, window_naturals in windows:
+        for slots in _set_slot_choices(set_sizes, len(NUMBERS)):
+            taken = {}
+            for size, slot in zip(set_sizes, slots):
+                demand, firsts = taken.get(NUMBERS[slot], (0, 0))
+                taken[NUMBERS[slot]] = (demand + size, firsts + 1)
+
+            used = window_naturals.copy()
+            run_naturals = window_naturals.copy()
+            bare = np.zeros_like(used)
+            for number, (demand, firsts) in taken.items():
+                have = numbers_held[:, number - 1]
+                bare += np.maximum(firsts - have, 0)
+                if run_length and start <= number < start + run_length:
+                    held = have > 0
+                    used -= held
+                    run_naturals -= held & (have <= firsts)
+                    demand += 1
+                used += np.minimum(have, demand)
+            if run_length:
+                bare += run_naturals == 0
+
+            missing = np.maximum(np.maximum(bare, total - used - wilds), 0)
+            best = missing if best is None else np.minimum(best, missing)
+    return best
+
+
+def batch_satisfiable(phase_goal, hists, colors=None):
+    """Boolean mask of the rows that can lay phase_goal right now."""
+    return batch_missing(phase_goal, hists, colors) == 0
+
+
+@functools.lru_cache(maxsize=None)
+def _table_arrays(table):
+    """
+    (caps, slot bases, offsets, data) of a PhaseTable as flat arrays, where
+    offsets[base[i] + t * width + v] is PhaseTable's offset of value v in slot
+    i with t cards of budget left.
+    """
+    width = max(table.caps) + 1
+    offsets = np.zeros((len(table.caps), table.max_cards + 1, width), dtype=np.intp)
+    for i, per_budget in enumerate(table._offsets):
+        for t, row in enumerate(per_budget):
+            offsets[i, t, :len(row)] = row
+    bases = np.arange(len(table.caps), dtype=np.int16) * offsets[0].size
+    return (np.array(table.caps, dtype=np.int8), bases, width, offsets.ravel(),
+            np.frombuffer(table.data, dtype=np.uint8))
+
+
+def table_missing(phase_goal, hists):
+    """
+    batch_missing for a compiled group phase, read from its PhaseTable: one
+    rank and one lookup per row. Rows too big for the table, or every row if
+    the phase has none, fall back to batch_missing.
+    """
+    table = phase_goal.table
+    if table is None:
+        return batch_missing(phase_goal, hists)
+    caps, bases, width, offsets, data = _table_arrays(table)
+    clamped = np.minimum(hists, caps)
+    spent = clamped.cumsum(axis=1, dtype=np.int16)
+    fits = spent[:, -1] <= table.max_cards
+    if not fits.all():
+        missing = np.empty(len(clamped), dtype=np.int16)
+        missing[fits] = table_missing(phase_goal, hists[fits])
+        missing[~fits] = batch_missing(phase_goal, hists[~fits])
+        return missing
+    # Slot i's offset index, with max_cards minus what the slots before it spent as budget
+    index = np.subtract(table.max_cards, spent, out=spent)
+    index += clamped
+    index *= width
+    index += clamped
+    index += bases
+    return data.take(offsets.take(index).sum(axis=1)).astype(np.int16)
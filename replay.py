@@ -0,0 +1,226 @@
+"""
+Rebuilds games from their seed and action log (see Game.action_log).
+
+A log file is a sequence of records, one per game:
+
+    seed (8 bytes, little-endian) | seats (1 byte) | log length (4 bytes) | log bytes
+
+replay(seed, log, seats) replays one game with no web layer and no bot search (the
+computer's logged choices stand in for its policy). The CLI bulk-replays a
+file over a process pool and prints a digest of every final state, so two
+commits can be checked for identical behaviour and timed on the same games.
+
+    python simulate.py --games 100000 --log games.log
+    python replay.py games.log --workers 8
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+
+import snapshot
+from game_logic import (
+    Game, INDEX_BITS, MIN_SEATS, NO_CARD, NO_INDEX, NO_TARGET, OP_CODE_MASK, SEAT_SHIFT,
+    TURN_UNSCRIPTED,
+    OP_ADD_TO_PHASE, OP_ATTEMPT_PHASE, OP_COMPUTER_TURN, OP_DISCARD, OP_DISCARD_SELECTED,
+    OP_DRAW, OP_DUMP_HITS, OP_HIT, OP_REMOVE_FROM_PHASE, OP_SELECT, OP_SUBMIT_PHASE,
+)
+
+_RECORD = struct.Struct("<QBI")
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class ScriptedPolicy:
+    """Plays back one logged computer turn through the normal policy interface."""
+    __slots__ = ("from_discard", "index")
+
+    def __init__(self, arg):
+        self.from_discard = bool(arg >> INDEX_BITS)
+        self.index = arg & NO_CARD
+
+    def choose_draw(self, game):
+        return self.from_discard
+
+    def choose_discard(self, game):
+        return self.index
+
+
+def _index(arg):
+    # Out-of-range indices were logged as NO_INDEX; they replay as the same no-op.
+    return arg if arg != NO_INDEX else -1
+
+
+def _target(arg):
+    return arg if arg != NO_TARGET else None
+
+
+def _computer_turn(game, seat, arg):
+    if arg == TURN_UNSCRIPTED:
+        game.computer_turn()
+    else:
+        game.computer_turn(policy=ScriptedPolicy(arg))
+
+
+def _discard(game, seat, arg):
+    index = arg & NO_CARD
+    game.discard_card(index if index != NO_CARD else -1, seat, _target(arg >> INDEX_BITS))
+
+
+# op code -> apply(game, seat, arg)
+APPLY = {
+    OP_DRAW: lambda game, seat, arg: game.draw_card(seat, from_discard=bool(arg)),
+    OP_SELECT: lambda game, seat, arg: game.select_card(_index(arg)),
+    OP_DISCARD_SELECTED: lambda game, seat, arg: game.discard_selected_card(_target(arg)),
+    OP_DISCARD: _discard,
+    OP_ADD_TO_PHASE: lambda game, seat, arg: game.add_to_phase_attempt(_index(arg)),
+    OP_REMOVE_FROM_PHASE: lambda game, seat, arg: game.remove_from_phase_attempt(_index(arg)),
+    OP_SUBMIT_PHASE: lambda game, seat, arg: game.submit_phase(),
+    OP_HIT: lambda game, seat, arg: game.hit_existing_phase(_index(arg)),
+    OP_DUMP_HITS: lambda game, seat, arg: game.dump_hits(seat),
+    OP_ATTEMPT_PHASE: lambda game, seat, arg: game.attempt_phase(seat),
+    OP_COMPUTER_TURN: _computer_turn,
+}
+
+
+def replay(seed, log, seats=MIN_SEATS, until=None):
+    """
+    A Game rebuilt from its seed by applying the logged actions in order
+    (only the first `until` of them, if given). The rebuilt game's own log
+    is the replayed prefix, so it can keep playing and be logged again.
+    """
+    game = Game(seed, seats)
+    end = len(log) if until is None else min(len(log), 2 * until)
+    for _ in steps(game, log[:end]):
+        pass
+    game.action_log = array("B", log[:end])
+    return game
+
+
+def steps(game, log):
+    """
+    Applies the logged actions to game one at a time, yielding the game
+    after each, for callers that watch a game unfold. The actions aren't
+    logged again, so game.action_log is left as it was.
+    """
+    if len(log) % 2:
+        raise ReplayError("action log has an odd number of bytes")
+    apply = APPLY
+    # Skip re-logging every action as it replays.
+    game._acting = True
+    try:
+        for pos in range(0, len(log), 2):
+            op = log[pos]
+            action = apply.get(op & OP_CODE_MASK)
+            if action is None:
+                raise ReplayError(f"unknown action {op} at byte {pos}")
+            action(game, op >> SEAT_SHIFT, log[pos + 1])
+            yield game
+    finally:
+        del game._acting
+
+
+def state_digest(game):
+    """Short hash of everything in a game's state (its snapshot)."""
+    return hashlib.blake2b(snapshot.dumps(game), digest_size=8).hexdigest()
+
+
+# ------------------------------
+# Log files
+# ------------------------------
+def write_record(f, seed, log, seats=MIN_SEATS):
+    f.write(_RECORD.pack(seed, seats, len(log)))
+    f.write(log)
+
+
+def read_records(f):
+    """Yields (seed, seats, log bytes) for every record in an open log file."""
+    while True:
+        head = f.read(_RECORD.size)
+        if not head:
+            return
+        if len(head) < _RECORD.size:
+            raise ReplayError("truncated record header")
+        seed, seats, length = _RECORD.unpack(head)
+        log = f.read(length)
+        if len(log) < length:
+            raise ReplayError("truncated action log")
+        yield seed, seats, log
+
+
+def _replay_chunk(records):
+    """Worker entry point: (digests, actions replayed) for a chunk of records."""
+    digests = []
+    actions = 0
+    for seed, seats, log in records:
+        digests.append(state_digest(replay(seed, log, seats)))
+        actions += len(log) // 2
+    return digests, actions
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_file(path, workers=None, chunk_size=200):
+    """
+    Replays every game in a log file, in order, across a process pool.
+    Returns (games, actions, digest) where digest combines every final state.
+    """
+    workers = workers or os.cpu_count() or 1
+    combined = hashlib.blake2b(digest_size=16)
+    games = actions = 0
+    with open(path, "rb") as f:
+        chunks = _chunks(read_records(f), chunk_size)
+        if workers == 1:
+            results = map(_replay_chunk, chunks)
+            for digests, count in results:
+                games += len(digests)
+                actions += count
+                combined.update("".join(digests).encode())
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                for digests, count in pool.imap(_replay_chunk, chunks):
+                    games += len(digests)
+                    actions += count
+                    combined.update("".join(digests).encode())
+    return games, actions, combined.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay logged Phase 10 games")
+    parser.add_argument("path", help="log file written by simulate.py --log")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games per worker task")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    games, actions, digest = replay_file(args.path, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - started
+    json.dump({
+        "games": games,
+        "actions": actions,
+        "digest": digest,
+        "elapsed_seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "actions_per_second": actions / elapsed if elapsed else 0.0,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
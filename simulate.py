@@ -0,0 +1,241 @@
+"""
+Headless self-play for Phase 10.
+
+Plays complete bot-vs-bot games on top of game_logic.Game with no web layer
+(draw -> attempt_phase -> discard -> end_round) and fans them out
+over a process pool. Each worker plays a chunk of seeded games and sends back
+one aggregated SimStats, so the parent only merges small summaries and the
+throughput scales with the number of cores. With --log, every game's seed and
+action log are also written out for replay.py.
+
+    python simulate.py --games 100000 --workers 8
+    python simulate.py --games 10000 --seats 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import replay
+from game_logic import HUMAN, MIN_SEATS, Game, solve_phase
+
+MAX_TURNS = 5000  # safety net against a game that can never finish
+
+
+class SimStats:
+    """Aggregated results of many simulated games, mergeable across workers."""
+
+    def __init__(self, seats=MIN_SEATS, phase_count=len(Game.PHASES)):
+        self.games = 0
+        self.unfinished = 0
+        self.turns = 0
+        self.hands = 0
+        self.exhausted_hands = 0
+        self.wins = [0] * seats
+        # Hands a seat spent on each phase, and turns it took to lay it.
+        self.hands_per_phase = [0] * phase_count
+        self.laid_per_phase = [0] * phase_count
+        self.turns_to_lay = [0] * phase_count
+
+    def merge(self, other):
+        self.games += other.games
+        self.unfinished += other.unfinished
+        self.turns += other.turns
+        self.hands += other.hands
+        self.exhausted_hands += other.exhausted_hands
+        for seat, wins in enumerate(other.wins):
+            self.wins[seat] += wins
+        for i in range(len(self.hands_per_phase)):
+            self.hands_per_phase[i] += other.hands_per_phase[i]
+            self.laid_per_phase[i] += other.laid_per_phase[i]
+            self.turns_to_lay[i] += other.turns_to_lay[i]
+        return self
+
+    def summary(self):
+        phases = []
+        for i, hands in enumerate(self.hands_per_phase):
+            laid = self.laid_per_phase[i]
+            phases.append({
+                "phase": i + 1,
+                "hands": hands,
+                "hands_per_game": hands / self.games if self.games else 0.0,
+                "avg_turns_to_lay": self.turns_to_lay[i] / laid if laid else None,
+            })
+        return {
+            "games": self.games,
+            "unfinished": self.unfinished,
+            "wins": list(self.wins),
+            "avg_turns_per_game": self.turns / self.games if self.games else 0.0,
+            "hands": self.hands,
+            "deck_exhaustion_rate": self.exhausted_hands / self.hands if self.hands else 0.0,
+            "phases": phases,
+        }
+
+
+# ------------------------------
+# Bot seats
+# ------------------------------
+def player_bot_turn(game, rng):
+    """
+    Plays the human seat the way Game.computer_turn plays the others.
+    The bot draws its choices from its own rng: the game's RNG belongs to
+    the game, or replaying its action log would deal different cards.
+    """
+    hand = game.hands[HUMAN]
+    game.draw_card(HUMAN)
+    if not game.submitted[HUMAN]:
+        solved = solve_phase(hand, game.PHASES[game.phases[HUMAN]])
+        if solved is not None:
+            # Move the solved cards into the submission box, highest index first
+            # so the remaining indices stay valid.
+            used = sorted((i for _, indices in solved for i in indices), reverse=True)
+            for i in used:
+                game.add_to_phase_attempt(i)
+            game.submit_phase()
+    if game.submitted[HUMAN]:
+        game.dump_hits(HUMAN)
+    if hand:
+        game.select_card(rng.randrange(len(hand)))
+        game.discard_selected_card()
+
+
+def play_game(seed, stats, max_turns=MAX_TURNS, logs=None, seats=MIN_SEATS):
+    """
+    Plays one complete game and folds its outcome into stats.
+    If given a list, appends (seed, seats, action log bytes) to logs.
+    """
+    game = Game(seed, seats)
+    bot_rng = random.Random(seed)
+    turns = 0
+    hand_turns = 0
+    hand_round = game.round
+    hand_phases = list(game.phases)
+    laid = [False] * seats
+    exhausted = False
+
+    while not game.over:
+        if turns >= max_turns:
+            stats.unfinished += 1
+            break
+        if game.turn == HUMAN:
+            player_bot_turn(game, bot_rng)
+        else:
+            game.computer_turn()
+        turns += 1
+        hand_turns += 1
+
+        if game.round != hand_round:
+            # The hand ended: book it against the phases every seat was on.
+            stats.hands += 1
+            stats.exhausted_hands += exhausted
+            for phase in hand_phases:
+                stats.hands_per_phase[phase] += 1
+            hand_turns = 0
+            hand_round = game.round
+            hand_phases = list(game.phases)
+            laid = [False] * seats
+            exhausted = False
+            continue
+
+        exhausted = exhausted or not game.deck
+        for seat, submitted in enumerate(game.submitted):
+            if submitted and not laid[seat]:
+                laid[seat] = True
+                stats.laid_per_phase[hand_phases[seat]] += 1
+                stats.turns_to_lay[hand_phases[seat]] += hand_turns
+    else:
+        winner = max(range(seats), key=game.phases.__getitem__)
+        stats.wins[winner] += 1
+
+    stats.games += 1
+    stats.turns += turns
+    if logs is not None:
+        logs.append((seed, seats, game.action_log.tobytes()))
+    return stats
+
+
+def play_chunk(task):
+    """
+    Worker entry point: plays a range of seeds and returns their SimStats,
+    plus their action logs if asked for (else None).
+    """
+    seeds, keep_logs, seats = task
+    stats = SimStats(seats)
+    logs = [] if keep_logs else None
+    for seed in seeds:
+        play_game(seed, stats, logs=logs, seats=seats)
+    return stats, logs
+
+
+# ------------------------------
+# Process-pool fan-out
+# ------------------------------
+def run(games, workers=None, chunk_size=200, base_seed=0, on_logs=None, seats=MIN_SEATS):
+    """
+    Plays `games` seeded games across a process pool and yields
+    (total_stats, elapsed_seconds) after every finished chunk, so callers
+    can stream progress. The last value yielded is the final result.
+    If on_logs is given, it is called in this process with each chunk's
+    [(seed, seats, action log)] as the chunk comes back.
+    """
+    workers = workers or os.cpu_count() or 1
+    keep_logs = on_logs is not None
+    chunks = [(range(start, min(start + chunk_size, base_seed + games)), keep_logs, seats)
+              for start in range(base_seed, base_seed + games, chunk_size)]
+    total = SimStats(seats)
+    started = time.perf_counter()
+    if workers == 1:
+        results = map(play_chunk, chunks)
+        for partial, logs in results:
+            total.merge(partial)
+            if keep_logs:
+                on_logs(logs)
+            yield total, time.perf_counter() - started
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for partial, logs in pool.imap_unordered(play_chunk, chunks):
+            total.merge(partial)
+            if keep_logs:
+                on_logs(logs)
+            yield total, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Phase 10 self-play simulator")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games per worker task")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--seats", type=int, default=MIN_SEATS, help="players per game, all played by bots")
+    parser.add_argument("--log", help="write every game's seed and action log here (see replay.py)")
+    args = parser.parse_args(argv)
+
+    log_file = open(args.log, "wb") if args.log else None
+    on_logs = None
+    if log_file:
+        def on_logs(logs):
+            for seed, seats, log in logs:
+                replay.write_record(log_file, seed, log, seats)
+
+    stats, elapsed = SimStats(args.seats), 0.0
+    try:
+        for stats, elapsed in run(args.games, args.workers, args.chunk_size, args.seed, on_logs,
+                                  args.seats):
+            rate = stats.games / elapsed if elapsed else 0.0
+            print(f"{stats.games}/{args.games} games, {rate:,.0f} games/s", file=sys.stderr)
+    finally:
+        if log_file:
+            log_file.close()
+
+    result = stats.summary()
+    result["elapsed_seconds"] = elapsed
+    result["games_per_second"] = stats.games / elapsed if elapsed else 0.0
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Compact binary snapshots of a Game, and a file-backed store for them.
+
+A snapshot holds every piece of per-game state: card codes for the deck,
+discard pile, every seat's hand and the phase submission box, each seat's
+laid combos, phase index and pending skips, who has seen which card, the turn, the game's RNG state, and its seed and action
+log (so a restored game can still be replayed). Everything except the RNG
+(624 Mersenne Twister words) and the log fits in a couple hundred bytes.
+
+SnapshotStore appends snapshots to a single log file and keeps an in-memory
+index of game id -> latest record, so a restore is one positioned read.
+Workers sharing the file pick up each other's writes by scanning only the
+bytes appended since their last look.
+"""
+import contextlib
+import os
+import random
+import struct
+import threading
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # no POSIX record locks (Windows): one process per store
+    fcntl = None
+
+from game_logic import COLORS, DECK_SIZE, CardList, Deck, Game, Hand, HitIndex, UnseenCards
+
+MAGIC = b"P10"
+VERSION = 5
+
+_HEADER = struct.Struct("<3sBIHBBBB")  # magic, format version, game version, round, seats, turn, flags, selection
+_SEAT = struct.Struct("<BBB")  # phase, submitted, pending skips
+_RNG = struct.Struct("<B625IBd")  # version, MT state words + position, has_gauss, gauss_next
+_LOG = struct.Struct("<QI")  # seed, action log length
+_RECORD = struct.Struct("<16sI")  # game id, payload length (0 = deleted)
+
+COMBO_TYPES = ("set", "run", "color")
+
+# Bits of the flags byte
+_HAS_DRAWN = 1
+_HAS_SELECTION = 2
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+# ------------------------------
+# Encoding
+# ------------------------------
+def dumps(game):
+    """Serializes a Game to bytes."""
+    flags = (
+        (_HAS_DRAWN if game.has_drawn else 0)
+        | (_HAS_SELECTION if game.selected_card_index is not None else 0)
+    )
+    out = bytearray(_HEADER.pack(
+        MAGIC, VERSION, game.version, game.round,
+        game.seats, game.turn, flags, game.selected_card_index or 0,
+    ))
+    for cards in (game.deck, game.discard_pile, game.phase_submission_box):
+        _put_codes(out, cards.codes)
+    out += game.unseen.seen_by
+    for seat in range(game.seats):
+        out += _SEAT.pack(game.phases[seat], game.submitted[seat], game.skips[seat])
+        _put_codes(out, game.hands[seat].codes)
+        combos = game.played_phases[seat]
+        out.append(len(combos))
+        for combo in combos:
+            _put_combo(out, combo)
+
+    version, state, gauss_next = game.rng.getstate()
+    out += _RNG.pack(version, *state, gauss_next is not None, gauss_next or 0.0)
+    out += _LOG.pack(game.seed, len(game.action_log))
+    out += game.action_log
+    return bytes(out)
+
+
+def loads(data):
+    """Rebuilds a Game from bytes produced by dumps()."""
+    view = memoryview(data)
+    (magic, version, game_version, round_,
+     seats, turn, flags, selection) = _HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"not a version {VERSION} Phase 10 snapshot")
+    pos = _HEADER.size
+
+    game = Game.__new__(Game)
+    game.version = game_version
+    game.round = round_
+    game.seats = seats
+    game.turn = turn
+    game.has_drawn = bool(flags & _HAS_DRAWN)
+    game.selected_card_index = selection if flags & _HAS_SELECTION else None
+
+    deck_codes, pos = _get_codes(view, pos)
+    codes, pos = _get_codes(view, pos)
+    game.discard_pile = CardList.from_codes(codes)
+    codes, pos = _get_codes(view, pos)
+    game.phase_submission_box = Hand.from_codes(codes)
+    game.unseen = UnseenCards(seats, view[pos:pos + DECK_SIZE])
+    pos += DECK_SIZE
+
+    game.phases = []
+    game.submitted = []
+    game.skips = []
+    game.hands = []
+    game.played_phases = []
+    for _ in range(seats):
+        phase, submitted, skips = _SEAT.unpack_from(view, pos)
+        game.phases.append(phase)
+        game.submitted.append(bool(submitted))
+        game.skips.append(skips)
+        codes, pos = _get_codes(view, pos + _SEAT.size)
+        game.hands.append(Hand.from_codes(codes))
+        count = view[pos]
+        pos += 1
+        combos = []
+        for _ in range(count):
+            combo, pos = _get_combo(view, pos)
+            combos.append(combo)
+        game.played_phases.append(combos)
+    game.hit_index = HitIndex(game.played_phases)
+    game.assign_goals()
+
+    fields = _RNG.unpack_from(view, pos)
+    game.rng = random.Random()
+    game.rng.setstate((fields[0], tuple(fields[1:626]), fields[627] if fields[626] else None))
+    game.deck = Deck(game.rng, deck_codes)
+    pos += _RNG.size
+    game.seed, log_length = _LOG.unpack_from(view, pos)
+    pos += _LOG.size
+    game.action_log = array("B", view[pos:pos + log_length])
+    return game
+
+
+def _put_codes(out, codes):
+    out.append(len(codes))
+    out += codes
+
+
+def _get_codes(view, pos):
+    length = view[pos]
+    start = pos + 1
+    return bytes(view[start:start + length]), start + length
+
+
+def _put_combo(out, combo):
+    kind = COMBO_TYPES.index(combo["type"])
+    if combo["type"] == "set":
+        key = combo["number"]
+    elif combo["type"] == "color":
+        key = COLORS.index(combo["color"])
+    else:
+        key = 0
+    out.append(kind)
+    out.append(key)
+    _put_codes(out, bytes(card.code for card in combo["cards"]))
+
+
+def _get_combo(view, pos):
+    kind, key = view[pos], view[pos + 1]
+    codes, pos = _get_codes(view, pos + 2)
+    combo = {"type": COMBO_TYPES[kind], "cards": list(CardList.from_codes(codes))}
+    if combo["type"] == "set":
+        combo["number"] = key
+    elif combo["type"] == "color":
+        combo["color"] = COLORS[key]
+    return combo, pos
+
+
+# ------------------------------
+# File-backed store
+# ------------------------------
+class SnapshotStore:
+    """
+    Append-only snapshot log. Game ids are uuid4().hex strings.
+
+    Every save appends one record with a single O_APPEND write, so several
+    worker processes can share the file; load() first indexes whatever other
+    workers appended since the last call, then does one positioned read.
+    Superseded records stay in the file until compact() rewrites it.
+
+    locked(game_id) is the cross-process half of GameStore.checkout's lock:
+    a byte-range lock, at an offset taken from the game id, on a sibling
+    ".lock" file, so two workers never load, change and save the same game
+    at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._index = {}  # game id bytes -> (payload offset, length)
+        self._scanned = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        os.close(self._fd)
+        os.close(self._lock_fd)
+
+    @contextlib.contextmanager
+    def locked(self, game_id):
+        """
+        Holds game_id's lock against every other process sharing the store.
+        Record locks belong to the process, so threads in one process must
+        already exclude each other (GameStore's per-game lock does) and must
+        not nest this for the same game.
+        """
+        if fcntl is None:
+            yield
+            return
+        offset = int.from_bytes(bytes.fromhex(game_id)[:7], "little")
+        fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, offset)
+
+    def save(self, game_id, game):
+        self._append(game_id, dumps(game))
+
+    def delete(self, game_id):
+        self._append(game_id, b"")
+
+    def version(self, game_id):
+        """Opaque token that changes whenever game_id is saved again (None if absent)."""
+        with self._lock:
+            self._catch_up()
+            location = self._index.get(bytes.fromhex(game_id))
+        return location[0] if location else None
+
+    def load(self, game_id):
+        """Returns the latest saved Game for game_id, or None."""
+        with self._lock:
+            self._catch_up()
+            location = self._index.get(bytes.fromhex(game_id))
+        if location is None:
+            return None
+        offset, length = location
+        return loads(os.pread(self._fd, length, offset))
+
+    def compact(self):
+        """
+        Rewrites the log with only the latest record per game. Run it while
+        no other process is writing to the file.
+        """
+        with self._lock:
+            self._catch_up()
+            tmp_path = self.path + ".compact"
+            with open(tmp_path, "wb") as tmp:
+                for key, (offset, length) in self._index.items():
+                    tmp.write(_RECORD.pack(key, length))
+                    tmp.write(os.pread(self._fd, length, offset))
+            os.replace(tmp_path, self.path)
+            self._catch_up()
+
+    def _append(self, game_id, payload):
+        os.write(self._fd, _RECORD.pack(bytes.fromhex(game_id), len(payload)) + payload)
+
+    def _catch_up(self):
+        """Indexes records appended since the last scan. Called with self._lock held."""
+        stat = os.fstat(self._fd)
+        if os.stat(self.path).st_ino != stat.st_ino:
+            # Another process compacted the log: reopen it and index from scratch.
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self._index = {}
+            self._scanned = 0
+            stat = os.fstat(self._fd)
+        size = stat.st_size
+        if size == self._scanned:
+            return
+        data = os.pread(self._fd, size - self._scanned, self._scanned)
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            key, length = _RECORD.unpack_from(data, pos)
+            start = pos + _RECORD.size
+            if start + length > len(data):
+                break  # a record still being written; pick it up next time
+            if length:
+                self._index[key] = (self._scanned + start, length)
+            else:
+                self._index.pop(key, None)
+            pos = start + length
+        self._scanned += pos
@@ -0,0 +1,212 @@
+"""
+JSON view of a Game for the /api routes.
+
+game_view() flattens everything the player may see into plain JSON types.
+An action is answered with diff_views(before, after): only the fields that
+changed, where the card lists (hand, phase box) are sent as a splice instead
+of in full. Clients pass the version they last saw as `since`; if it no
+longer matches the game's version they get the full view instead of a delta.
+"""
+from game_logic import (
+    COLORS, HUMAN, PHASES, UNSEEN_COLOR_SLOT, UNSEEN_SKIP_SLOT, UNSEEN_WILD_SLOT,
+)
+
+# Card lists sent as splices rather than whole
+SPLICED_FIELDS = ("hand", "phase_box")
+
+
+def card_view(card):
+    return {"code": card.code, "color": card.color, "number": card.number}
+
+
+def combo_view(combo):
+    view = {"type": combo["type"], "cards": [card_view(card) for card in combo["cards"]]}
+    if "number" in combo:
+        view["number"] = combo["number"]
+    if "color" in combo:
+        view["color"] = combo["color"]
+    if "low" in combo:
+        view["low"] = combo["low"]
+        view["high"] = combo["high"]
+    return view
+
+
+def phase_view(index):
+    return {"index": index, "goal": PHASES[index] if index < len(PHASES) else None}
+
+
+def unseen_view(unseen, seat):
+    counts = unseen.counts[seat]
+    return {
+        "total": unseen.totals[seat],
+        "numbers": counts[:UNSEEN_COLOR_SLOT],
+        "colors": dict(zip(COLORS, counts[UNSEEN_COLOR_SLOT:UNSEEN_WILD_SLOT])),
+        "wilds": counts[UNSEEN_WILD_SLOT],
+        "skips": counts[UNSEEN_SKIP_SLOT],
+    }
+
+
+def game_view(game):
+    """Everything the player can see, as JSON-ready values."""
+    return {
+        "version": game.version,
+        "round": game.round,
+        "over": game.over,
+        "seats": game.seats,
+        "turn": "player" if game.turn == HUMAN else "computer",
+        "turn_seat": game.turn,
+        "has_drawn": game.has_drawn,
+        "skips": list(game.skips),
+        "phase_submitted": game.submitted[HUMAN],
+        "selected_card_index": game.selected_card_index,
+        "player_phase": phase_view(game.phases[HUMAN]),
+        "hand": [card_view(card) for card in game.hands[HUMAN]],
+        "phase_box": [card_view(card) for card in game.phase_submission_box],
+        "can_submit": not game.over and not game.submitted[HUMAN] and game.check_phase_attempt(),
+        "hand_distance": game.phase_distance(),
+        "discard_top": card_view(game.discard_pile[-1]) if game.discard_pile else None,
+        "deck_count": len(game.deck),
+        "unseen": unseen_view(game.unseen, HUMAN),
+        "discard_count": len(game.discard_pile),
+        "opponents": [
+            {
+                "seat": seat,
+                "phase": phase_view(game.phases[seat]),
+                "phase_submitted": game.submitted[seat],
+                "hand_count": len(game.hands[seat]),
+            }
+            for seat in range(game.seats) if seat != HUMAN
+        ],
+        "played_phases": [[combo_view(combo) for combo in combos] for combos in game.played_phases],
+    }
+
+
+def event_view(kind, data):
+    """JSON-ready payload for an on_event callback from Game.computer_turn."""
+    if kind == "phase":
+        return {"seat": data["seat"], "combos": [combo_view(combo) for combo in data["combos"]]}
+    if kind in ("discard", "hit"):
+        return dict(data, card=card_view(data["card"]))
+    return data
+
+
+def splice(old, new):
+    """
+    Smallest single splice turning list old into list new:
+    {"start": i, "delete": n, "insert": [...]}. Covers pops and appends
+    (the only ways a hand changes) in one small object.
+    """
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    return {"start": start, "delete": end_old - start, "insert": new[start:end_new]}
+
+
+def diff_views(before, after):
+    """The fields of `after` that differ from `before`."""
+    changes = {}
+    for key, value in after.items():
+        if before.get(key) == value:
+            continue
+        changes[key] = splice(before[key], value) if key in SPLICED_FIELDS else value
+    return changes
+
+
+# ------------------------------
+# Actions
+# ------------------------------
+def _draw(game, args):
+    if game.turn == HUMAN:
+        game.draw_card(HUMAN, from_discard=bool(args.get("from_discard")))
+
+
+def _discard(game, args):
+    if game.turn == HUMAN:
+        target = args.get("target")
+        game.discard_selected_card(None if target is None else int(target))
+
+
+ACTIONS = {
+    "draw": _draw,
+    "select": lambda game, args: game.select_card(int(args["card_index"])),
+    "discard": _discard,
+    # The computer seats play on the app's bot pool, never inside a request:
+    # this only asks for a refreshed view while the caller hands the turn over.
+    "computer_turn": lambda game, args: None,
+    "add_to_phase": lambda game, args: game.add_to_phase_attempt(int(args["card_index"])),
+    "remove_from_phase": lambda game, args: game.remove_from_phase_attempt(int(args["card_index"])),
+    "submit_phase": lambda game, args: game.submit_phase(),
+    "hit": lambda game, args: game.hit_existing_phase(int(args["card_index"])),
+}
+
+
+# Most actions one batch may carry
+MAX_BATCH = 64
+
+
+# Args an action can't run without
+REQUIRED_ARGS = {
+    "select": ("card_index",),
+    "add_to_phase": ("card_index",),
+    "remove_from_phase": ("card_index",),
+    "hit": ("card_index",),
+}
+
+
+def _checked_args(name, args):
+    """
+    A copy of an action's args with the numeric ones parsed, so bad input
+    fails up front. Raises KeyError if a required one is missing.
+    """
+    args = dict(args)
+    for key in REQUIRED_ARGS.get(name, ()):
+        if args.get(key) is None:
+            raise KeyError(f"{name} needs {key}")
+    for key in ("card_index", "target"):
+        if args.get(key) is not None:
+            args[key] = int(args[key])
+    return args
+
+
+def apply_actions(game, actions, since=None):
+    """
+    Runs an ordered list of {"name": ..., "args": {...}} actions against
+    game as one step, each seeing the state the previous one left (so card
+    indices refer to the hand as it is by then). Every entry is checked
+    before any of them runs, so a malformed one rejects the whole batch
+    instead of leaving it half applied. Answers like apply_action.
+    Raises KeyError, ValueError or TypeError for a bad batch.
+    """
+    if not isinstance(actions, list) or len(actions) > MAX_BATCH:
+        raise ValueError(f"expected a list of at most {MAX_BATCH} actions")
+    steps = [(ACTIONS[action["name"]], _checked_args(action["name"], action.get("args") or {}))
+             for action in actions]
+    before = game_view(game) if since == game.version else None
+    for action, args in steps:
+        action(game, args)
+    after = game_view(game)
+    if before is None:
+        return {"version": game.version, "state": after}
+    return {"version": game.version, "changes": diff_views(before, after)}
+
+
+def apply_action(game, name, args, since=None):
+    """
+    Runs one named action against game. Returns the response body:
+    {"version", "changes"} when the client was at `since` == the game's
+    version, otherwise {"version", "state"} with the full view.
+    Raises KeyError for an unknown action.
+    """
+    return apply_actions(game, [{"name": name, "args": args}], since)
+
+
+def state_since(game, since=None):
+    """Response body for a plain state poll."""
+    if since == game.version:
+        return {"version": game.version, "changes": {}}
+    return {"version": game.version, "state": game_view(game)}
@@ -0,0 +1,90 @@
+"""
+Randomized invariants over whole games: a log replays to the same state, a
+snapshot loads back byte for byte, and any stack of make() calls unmakes
+back to where it started without touching clones.
+"""
+import random
+
+import pytest
+
+import simulate
+import snapshot
+from game_logic import HUMAN, Game
+from replay import replay, state_digest
+
+SEATS = (2, 3, 6)
+SEEDS = range(4)
+
+
+def _play(game, rng, turns):
+    for _ in range(turns):
+        if game.over:
+            break
+        if game.turn == HUMAN:
+            simulate.player_bot_turn(game, rng)
+        else:
+            game.computer_turn()
+
+
+def _moves(game, rng):
+    """A spread of legal and illegal moves for the seat to play, plus an off-turn draw."""
+    seat = game.turn
+    size = len(game.hands[seat])
+    moves = [("draw", seat, rng.random() < 0.4), ("lay", seat), ("draw", (seat + 1) % game.seats, False)]
+    for _ in range(3):
+        moves.append(("discard", seat, rng.randrange(-1, size + 1), rng.choice([None, 0, 1, 2])))
+        moves.append(("hit", seat, rng.randrange(-1, size + 1)))
+    return moves
+
+
+@pytest.mark.parametrize("seats", SEATS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_replay_reproduces_game(seats, seed):
+    game = Game(seed, seats)
+    _play(game, random.Random(seed), 400)
+    replayed = replay(game.seed, game.action_log.tobytes(), seats)
+    assert state_digest(replayed) == state_digest(game)
+    assert snapshot.dumps(replayed) == snapshot.dumps(game)
+
+
+@pytest.mark.parametrize("seats", SEATS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_snapshot_round_trips(seats, seed):
+    game = Game(seed, seats)
+    rng = random.Random(seed)
+    for _ in range(8):
+        _play(game, rng, 40)
+        data = snapshot.dumps(game)
+        loaded = snapshot.loads(data)
+        assert snapshot.dumps(loaded) == data
+    # The loaded copy plays on exactly like the original.
+    _play(game, random.Random(seed), 40)
+    _play(loaded, random.Random(seed), 40)
+    assert snapshot.dumps(loaded) == snapshot.dumps(game)
+
+
+@pytest.mark.parametrize("seats", SEATS)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_unmake_restores_every_level(seats, seed):
+    game = Game(seed, seats)
+    rng = random.Random(seed)
+    _play(game, rng, rng.randrange(0, 300))
+    if game.over:
+        return
+    before = snapshot.dumps(game)
+    stack = []
+    for _ in range(rng.randrange(1, 30)):
+        if game.over:
+            break
+        undo = game.make(rng.choice(_moves(game, rng)))
+        stack.append((undo, snapshot.dumps(game)))
+    while stack:
+        undo, after = stack.pop()
+        assert snapshot.dumps(game) == after
+        game.unmake(undo)
+    assert snapshot.dumps(game) == before
+
+    clone = game.clone()
+    assert snapshot.dumps(clone) == before
+    _play(clone, rng, 4)
+    assert snapshot.dumps(game) == before
@@ -0,0 +1,106 @@
+"""
+The phase solver against a brute force that tries every set number, run
+start and split of naturals between the groups, on hands biased toward
+nearly finished phases so both answers are exercised.
+"""
+import itertools
+import random
+
+import pytest
+
+from game_logic import (
+    CARDS, STANDARD_PHASES, WILD_SLOT, compile_phase, hand_histogram, solve_groups, solve_phase,
+)
+
+GROUP_SPECS = [spec for spec in STANDARD_PHASES if "color" not in spec] + [
+    {"sets": 2, "set_size": 2, "run": 3},
+    {"sets": 1, "set_size": 2, "set_2": 3, "run": 3},
+]
+# Missing counts the brute force searches up to; anything past it only has to be past it.
+SEARCH_DEPTH = 2
+
+
+def _brute_ready(hist, set_sizes, run_length):
+    """Whether hist can lay the groups, by trying every assignment."""
+    wilds = hist[WILD_SLOT]
+    held = [n for n in range(1, 13) if hist[n - 1]]
+    starts = range(1, 14 - run_length) if run_length else [None]
+    # A set needs a natural of its number, so only held numbers can be set numbers.
+    for numbers in itertools.product(held, repeat=len(set_sizes)):
+        splits = [range(1, min(size, hist[n - 1]) + 1) for size, n in zip(set_sizes, numbers)]
+        for naturals in itertools.product(*splits):
+            used = [0] * 12
+            for n, count in zip(numbers, naturals):
+                used[n - 1] += count
+            if any(used[n] > hist[n] for n in range(12)):
+                continue
+            needed = sum(set_sizes) - sum(naturals)
+            for start in starts:
+                run_needed = 0
+                if run_length:
+                    run_naturals = sum(hist[n - 1] > used[n - 1] for n in range(start, start + run_length))
+                    if not run_naturals:
+                        continue
+                    run_needed = run_length - run_naturals
+                if needed + run_needed <= wilds:
+                    return True
+    return False
+
+
+def _brute_missing(hist, set_sizes, run_length, depth=SEARCH_DEPTH):
+    """Fewest cards to add before hist is ready, or None if more than depth."""
+    frontier = {hist}
+    for missing in range(depth + 1):
+        if any(_brute_ready(h, set_sizes, run_length) for h in frontier):
+            return missing
+        frontier = {h[:slot] + (h[slot] + 1,) + h[slot + 1:] for h in frontier for slot in range(13)}
+    return None
+
+
+def _near_phase_hands(rng, count):
+    """Hands of 8 to 11 cards drawn from a few neighbouring numbers, so sets and runs form."""
+    for _ in range(count):
+        low = rng.randint(1, 8)
+        codes = [code for code, card in enumerate(CARDS)
+                 if card.is_wild() or (not card.is_skip() and low <= card.number < low + 5)]
+        yield [CARDS[code] for code in rng.sample(codes, rng.randint(8, 11))]
+
+
+@pytest.mark.parametrize("spec", GROUP_SPECS, ids=str)
+def test_solver_matches_brute_force(spec):
+    phase = compile_phase(spec)
+    rng = random.Random(repr(spec))
+    for cards in _near_phase_hands(rng, 25):
+        hist = hand_histogram(cards)
+        missing = solve_groups(phase.set_sizes, phase.run_length, hist)[0]
+        expected = _brute_missing(hist, phase.set_sizes, phase.run_length)
+        if expected is None:
+            assert missing > SEARCH_DEPTH, hist
+        else:
+            assert missing == expected, hist
+        assert phase.missing(hist) == missing
+
+
+@pytest.mark.parametrize("spec", GROUP_SPECS + [{"color": 7}], ids=str)
+def test_solved_phase_is_laid_from_distinct_cards(spec):
+    phase = compile_phase(spec)
+    rng = random.Random(repr(spec))
+    for cards in _near_phase_hands(rng, 40):
+        solved = solve_phase(cards, phase)
+        assert (solved is not None) == (phase.deficit(cards) == 0)
+        if solved is None:
+            continue
+        used = [i for _, indices in solved for i in indices]
+        assert len(used) == len(set(used)) == phase.size
+        for combo, indices in solved:
+            group = [cards[i] for i in indices]
+            naturals = [card for card in group if not card.is_wild()]
+            assert naturals and not any(card.is_skip() for card in group)
+            if combo["type"] == "set":
+                assert len({card.number for card in naturals}) == 1
+            elif combo["type"] == "run":
+                # In run order with wilds in the gaps, so every natural agrees on the start
+                starts = {card.number - i for i, card in enumerate(group) if not card.is_wild()}
+                assert len(starts) == 1 and 1 <= min(starts) <= 13 - len(group)
+            else:
+                assert len({card.color for card in naturals}) == 1